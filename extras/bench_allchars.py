@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# Copyright (c) 2026 Dean Jackson <deanishe@deanishe.net>
+#
+# MIT Licence. See http://opensource.org/licenses/MIT
+#
+# Created on 2026-10-17
+#
+
+"""Compare MATCH_ALLCHARS regexes with the linear subsequence matcher.
+
+The regex ``.*?q.*?u.*?e.*?r.*?y`` backtracks when ``value`` contains
+most, but not all, of the query, which takes polynomial time in the
+length of ``value``. ``_match_allchars`` takes linear time.
+
+Usage:
+    python extras/bench_allchars.py
+"""
+
+from __future__ import print_function, unicode_literals, absolute_import
+
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+from workflow.workflow import _match_allchars  # noqa: E402
+
+# (description, query, value)
+CASES = [
+    ('short match', 'of', 'OmniFocus'),
+    ('short miss', 'xyz', 'The Dukes of Hazzard'),
+    ('sentence match', 'tdoh', 'The Dukes of Hazzard ' * 4),
+    ('long miss, 3 chars', 'aab', 'a' * 100),
+    ('long miss, 4 chars', 'aaab', 'a' * 50),
+    ('long miss, 5 chars', 'aaaab', 'a' * 30),
+    ('multi-line miss', 'aab', ('a' * 30 + '\n') * 5),
+]
+
+
+def regex_search(query):
+    """Return search function using the old regex."""
+    pattern = ''.join(['.*?' + re.escape(c) for c in query])
+    search = re.compile(pattern, re.IGNORECASE).search
+
+    def _search(value, lower):
+        m = search(value)
+        return m.span() if m else None
+
+    return _search
+
+
+def timeit(func, budget=0.2):
+    """Return average time in microseconds of calls to ``func``.
+
+    ``func`` is called until ``budget`` seconds have passed.
+    """
+    n = 0
+    start = time.time()
+    while True:
+        func()
+        n += 1
+        elapsed = time.time() - start
+        if elapsed >= budget:
+            return elapsed / n * 1e6
+
+
+def main():
+    """Run benchmarks."""
+    print('{:<22} {:>14} {:>14} {:>10}'.format(
+        'case', 'regex (us)', 'linear (us)', 'speedup'))
+    for name, query, value in CASES:
+        lower = value.lower()
+        regex = regex_search(query)
+        assert regex(value, lower) == _match_allchars(query, value, lower)
+
+        t1 = timeit(lambda: regex(value, lower))
+        t2 = timeit(lambda: _match_allchars(query, value, lower))
+        print('{:<22} {:>14.1f} {:>14.1f} {:>9.1f}x'.format(
+            name, t1, t2, t1 / t2))
+
+
+if __name__ == '__main__':
+    main()
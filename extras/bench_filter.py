@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# Copyright (c) 2026 Dean Jackson <deanishe@deanishe.net>
+#
+# MIT Licence. See http://opensource.org/licenses/MIT
+#
+# Created on 2026-10-17
+#
+
+"""Measure the per-item cost of ``Workflow.filter()``.
+
+Filters a list of randomly-generated titles (and a
+:class:`~workflow.FilterIndex` of them) and prints the average time
+per item in microseconds.
+
+Usage:
+    python extras/bench_filter.py [<items>]
+"""
+
+from __future__ import print_function, unicode_literals, absolute_import
+
+import os
+import random
+import shutil
+import string
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+from workflow import Workflow, FilterIndex, MATCH_ALL, MATCH_ALLCHARS  # noqa
+
+QUERIES = ['a', 'bot', 'the quick', 'xyz', 'caf']
+
+
+def make_items(n):
+    """Generate ``n`` random titles."""
+    rnd = random.Random(1)
+    letters = string.ascii_lowercase + 'éüö'
+    words = [''.join([rnd.choice(letters)
+                      for _ in range(rnd.randint(1, 9))])
+             for _ in range(5000)]
+    items = []
+    for _ in range(n):
+        title = [rnd.choice(words) for _ in range(rnd.randint(1, 5))]
+        items.append(' '.join([w.title() if rnd.random() < 0.4 else w
+                               for w in title]))
+    return items
+
+
+def per_item(wf, query, items, n, **kwargs):
+    """Return best per-item time of filtering ``items`` in microseconds."""
+    best = None
+    for _ in range(3):
+        start = time.time()
+        wf.filter(query, items, **kwargs)
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best / n * 1e6
+
+
+def main():
+    """Run benchmark."""
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    tempdir = tempfile.mkdtemp()
+    os.environ.update({
+        'alfred_workflow_bundleid': 'net.deanishe.alfred-workflow.bench',
+        'alfred_workflow_cache': tempdir,
+        'alfred_workflow_data': tempdir,
+    })
+    try:
+        wf = Workflow()
+        wf.filter_parallel_min = 0
+        items = make_items(n)
+        index = FilterIndex(items)
+
+        print('{:<12} {:>10} {:>10} {:>14} {:>14}'.format(
+            'query', 'list', 'index', 'list (-ALL)', 'index (-ALL)'))
+        for query in QUERIES:
+            times = [per_item(wf, query, data, n, match_on=match_on)
+                     for match_on in (MATCH_ALL, MATCH_ALL ^ MATCH_ALLCHARS)
+                     for data in (items, index)]
+            print('{:<12} {:>10.2f} {:>10.2f} {:>14.2f} {:>14.2f}'.format(
+                query, *[times[0], times[1], times[2], times[3]]))
+        print('\nmicroseconds per item ({} items)'.format(n))
+    finally:
+        shutil.rmtree(tempdir)
+
+
+if __name__ == '__main__':
+    main()
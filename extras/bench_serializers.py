@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# Copyright (c) 2026 Dean Jackson <deanishe@deanishe.net>
+#
+# MIT Licence. See http://opensource.org/licenses/MIT
+#
+# Created on 2026-10-17
+#
+
+"""Compare the registered serializers on different kinds of data.
+
+Saves and loads several generated payloads with every serializer
+registered with ``workflow.manager`` and prints the file size and
+the best of three dump and load times in milliseconds.
+
+Usage:
+    python extras/bench_serializers.py [<items>]
+"""
+
+from __future__ import print_function, unicode_literals, absolute_import
+
+import os
+import random
+import shutil
+import string
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+from workflow import manager  # noqa
+
+
+def make_payloads(n):
+    """Generate payloads of ``n`` items."""
+    rnd = random.Random(1)
+    words = [''.join([rnd.choice(string.ascii_lowercase)
+                      for _ in range(rnd.randint(2, 9))])
+             for _ in range(2000)]
+
+    def text(size):
+        return ' '.join([rnd.choice(words) for _ in range(size)])
+
+    return [
+        ('items', [{'title': text(4), 'subtitle': text(8), 'id': i,
+                    'tags': [rnd.choice(words) for _ in range(3)]}
+                   for i in range(n)]),
+        ('strings', [text(20) for _ in range(n)]),
+        ('numbers', [rnd.random() for _ in range(n * 5)]),
+        ('random', [''.join([rnd.choice(string.printable)
+                             for _ in range(40)])
+                    for _ in range(n)]),
+    ]
+
+
+def best(func, repeat=3):
+    """Return best time of calling ``func`` in milliseconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.time()
+        func()
+        times.append(time.time() - start)
+    return min(times) * 1000
+
+
+def main():
+    """Run benchmarks."""
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    tempdir = tempfile.mkdtemp()
+    try:
+        for label, data in make_payloads(n):
+            print('\n{0} ({1} items)'.format(label, len(data)))
+            print('{0:14s} {1:>10s} {2:>10s} {3:>10s}'.format(
+                'serializer', 'KiB', 'dump ms', 'load ms'))
+            for name in manager.serializers:
+                if name == 'pickle':  # far too slow to be interesting
+                    continue
+                serializer = manager.serializer(name)
+                path = os.path.join(tempdir, 'data.' + name)
+
+                def dump():
+                    with open(path, 'wb') as fp:
+                        serializer.dump(data, fp)
+
+                def load():
+                    with open(path, 'rb') as fp:
+                        serializer.load(fp)
+
+                try:
+                    t_dump = best(dump)
+                except ValueError:  # serializer doesn't support data
+                    print('{0:14s} {1:>10s}'.format(name, 'n/a'))
+                    continue
+                t_load = best(load)
+                print('{0:14s} {1:10.0f} {2:10.1f} {3:10.1f}'.format(
+                    name, os.path.getsize(path) / 1024.0, t_dump, t_load))
+    finally:
+        shutil.rmtree(tempdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# Copyright (c) 2026 Dean Jackson <deanishe@deanishe.net>
+#
+# MIT Licence. See http://opensource.org/licenses/MIT
+#
+# Created on 2026-10-17
+#
+
+"""Unit tests for :mod:`workflow.columnar`."""
+
+from __future__ import print_function, absolute_import, unicode_literals
+
+import cPickle
+
+import pytest
+
+import workflow.workflow
+from workflow.columnar import ColumnarSerializer, Rows
+from workflow.util import LRUCache
+
+from .test_workflow_filter import SEARCH_ITEMS
+
+DATA = [{'title': t[0], 'uid': unicode(i), 'score': i, 'tags': ['a', 'b']}
+        for i, t in enumerate(SEARCH_ITEMS)]
+
+
+def _dump(path, data):
+    with open(path, 'wb') as fp:
+        ColumnarSerializer.dump(data, fp)
+    with open(path, 'rb') as fp:
+        return ColumnarSerializer.load(fp)
+
+
+def test_roundtrip(tmpdir):
+    """Columnar: dump and load"""
+    rows = _dump(tmpdir.join('data.columns').strpath, DATA)
+    assert isinstance(rows, Rows)
+    assert len(rows) == len(DATA)
+    assert sorted(rows.columns) == ['score', 'tags', 'title', 'uid']
+    assert list(rows) == DATA
+    assert rows[-1] == DATA[-1]
+    assert rows[2:5] == DATA[2:5]
+    assert rows.column('title') == [d['title'] for d in DATA]
+    assert isinstance(rows[0]['title'], unicode)
+    assert rows[0] is rows[0]
+    assert cPickle.loads(cPickle.dumps(rows[1], -1)) == DATA[1]
+
+    with pytest.raises(IndexError):
+        rows[len(DATA)]
+    with pytest.raises(KeyError):
+        rows[0]['nonexistent']
+
+    # empty list
+    assert list(_dump(tmpdir.join('empty.columns').strpath, [])) == []
+
+
+def test_str_values(tmpdir):
+    """Columnar: UTF-8 str values are loaded as unicode"""
+    rows = _dump(tmpdir.join('data.columns').strpath,
+                 [{'a': b'bytes', 'b': 'ünïcödé'.encode('utf-8')}])
+    assert rows[0] == {'a': 'bytes', 'b': 'ünïcödé'}
+    assert isinstance(rows[0]['a'], unicode)
+
+
+def test_close(tmpdir):
+    """Columnar: close mapped file"""
+    path = tmpdir.join('data.columns').strpath
+    with _dump(path, DATA) as rows:
+        assert rows[0]['title'] == DATA[0]['title']
+    with pytest.raises(ValueError):
+        rows[1]['title']
+
+    rows = _dump(path, DATA)
+    assert not rows.closed
+    rows.close()
+    rows.close()
+    assert rows.closed
+
+
+def test_close_memory_cache(wf, monkeypatch):
+    """Columnar: closed rows aren't returned from memory cache"""
+    monkeypatch.setattr(workflow.workflow, '_memory_cache', None)
+    wf.memory_cache = LRUCache()
+    wf.store_data('items', DATA, serializer='columns')
+    rows = wf.stored_data('items')
+    assert wf.stored_data('items') is rows
+    rows.close()
+
+    rows = wf.stored_data('items')
+    assert not rows.closed
+    assert rows[1]['title'] == DATA[1]['title']
+    assert wf.stored_data('items') is rows
+
+
+def test_lazy(tmpdir):
+    """Columnar: only accessed columns are read"""
+    rows = _dump(tmpdir.join('data.columns').strpath, DATA)
+    assert rows._cells == {}
+    rows[3]['title']
+    assert list(rows._cells) == ['title']
+
+
+def test_invalid(tmpdir):
+    """Columnar: unsupported data"""
+    path = tmpdir.join('data.columns').strpath
+    for data in (['one', 'two'],
+                 [{'a': 1}, {'b': 2}],
+                 [{'a': 1}, {'a': 1, 'b': 2}],
+                 [{'a': object()}],
+                 [{'a': b'\xff'}]):
+        with pytest.raises((ValueError, TypeError)):
+            _dump(path, data)
+
+    with open(path, 'wb') as fp:
+        fp.write(b'not a columnar file')
+    with pytest.raises(ValueError):
+        with open(path, 'rb') as fp:
+            ColumnarSerializer.load(fp)
+
+
+def test_workflow(wf):
+    """Columnar: store and filter data"""
+    wf.store_data('items', DATA, serializer='columns')
+    rows = wf.stored_data('items')
+    assert isinstance(rows, Rows)
+
+    for query in ('bs', 'bt', 'omg', 'xyz'):
+        results = wf.filter(query, rows, key=lambda r: r['title'])
+        assert results == wf.filter(query, DATA, key=lambda d: d['title'])
+
+    assert list(rows._cells) == ['title']
+    assert wf.filter('bs', rows, key=lambda r: r['title'], cache=True) == \
+        wf.filter('bs', DATA, key=lambda d: d['title'])
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# Copyright (c) 2026 Dean Jackson <deanishe@deanishe.net>
+#
+# MIT Licence. See http://opensource.org/licenses/MIT
+#
+# Created on 2026-10-17
+#
+
+"""Unit tests for :mod:`workflow.frecency`."""
+
+from __future__ import print_function, absolute_import, unicode_literals
+
+import os
+import time
+
+import pytest
+
+from workflow.frecency import Frecency
+
+
+@pytest.fixture()
+def frecency(tmpdir):
+    """Frecency with a half-life of 10 seconds."""
+    return Frecency(tmpdir.join('test.frecency').strpath, half_life=10)
+
+
+def test_scores(frecency):
+    """Frecency: uses decay"""
+    now = time.time()
+    assert frecency.scores(now) == {}
+
+    frecency.add('a', now - 10)
+    frecency.add('a', now)
+    frecency.add('b', now - 20)
+    scores = frecency.scores(now)
+    # timestamps are saved to the millisecond
+    assert scores['a'] == pytest.approx(1.5, rel=0.001)
+    assert scores['b'] == pytest.approx(0.25, rel=0.001)
+    assert frecency.scores(now + 10)['a'] == pytest.approx(0.75, rel=0.001)
+
+    with pytest.raises(ValueError):
+        frecency.add('a\nb')
+
+
+def test_compact(frecency):
+    """Frecency: log is merged into counts"""
+    now = time.time()
+    frecency.add('a', now)
+    frecency.add('ünïcödé', now)
+    frecency.add('old', now - 1000)
+    assert os.path.exists(frecency.logpath)
+    assert not os.path.exists(frecency.path)
+
+    frecency.compact()
+    assert not os.path.exists(frecency.logpath)
+    assert os.path.exists(frecency.path)
+
+    frecency.add('a', now)
+    # read from disk
+    scores = Frecency(frecency.path, half_life=10).scores(now)
+    assert sorted(scores) == ['a', 'ünïcödé']
+    assert scores['a'] == pytest.approx(2, rel=0.01)
+    assert scores['ünïcödé'] == pytest.approx(1, rel=0.01)
+
+
+def test_auto_compact(tmpdir):
+    """Frecency: log is compacted when it gets large"""
+    frecency = Frecency(tmpdir.join('test.frecency').strpath,
+                        compact_size=100)
+    for i in range(20):
+        frecency.add('item %d' % (i % 3))
+        if os.path.exists(frecency.logpath):
+            assert os.path.getsize(frecency.logpath) < 100
+    assert os.path.exists(frecency.path)
+    assert sorted(frecency.scores()) == ['item 0', 'item 1', 'item 2']
+    assert frecency.scores()['item 0'] == pytest.approx(7, rel=0.01)
+
+
+def test_filter_boost(wf):
+    """Frecency: boost filter results"""
+    data = ['Safari', 'Sublime Text', 'System Preferences']
+    assert wf.filter('s', data) == data
+
+    frecency = wf.frecency('apps')
+    frecency.add('System Preferences')
+    frecency.add('System Preferences')
+    frecency.add('Sublime Text')
+    boost = frecency.booster(weight=20)
+    results = wf.filter('s', data, boost=boost, include_score=True)
+    assert [t[0] for t in results] == ['Sublime Text', 'System Preferences',
+                                       'Safari']
+    assert results[0][1] == pytest.approx(100 - 12 + 20 / 2.0, rel=0.001)
+    assert results[1][1] == pytest.approx(100 - 18 + 20 * 2 / 3.0,
+                                          rel=0.001)
+    assert results[2][1] == 100 - 6
+
+    assert list(wf.ifilter('s', data, boost=boost)) == [t[0] for t in results]
+    # boost is added before results are limited
+    assert wf.filter('s', data, boost=boost, min_score=90) == [
+        'Sublime Text', 'System Preferences', 'Safari']
+    assert wf.filter('s', data, boost=boost, max_results=1) == [
+        'Sublime Text']
+
+
+if __name__ == '__main__':  # pragma: no cover
+    pytest.main([__file__])
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# Copyright (c) 2026 Dean Jackson <deanishe@deanishe.net>
+#
+# MIT Licence. See http://opensource.org/licenses/MIT
+#
+# Created on 2026-10-17
+#
+
+"""Unit tests for :mod:`workflow.search`."""
+
+from __future__ import print_function, absolute_import, unicode_literals
+
+import os
+
+import pytest
+
+from workflow.search import SearchIndex
+from workflow.workflow import (
+    MATCH_ALL,
+    MATCH_ALLCHARS,
+    MATCH_CAPITALS,
+    MATCH_STARTSWITH,
+)
+
+from .test_workflow_filter import SEARCH_ITEMS
+
+DATA = [t[0] for t in SEARCH_ITEMS]
+
+
+@pytest.fixture()
+def index(tmpdir):
+    """Empty search index."""
+    with SearchIndex(tmpdir.join('index.sqlite').strpath) as index:
+        yield index
+
+
+def test_search_same_as_filter(wf, index):
+    """Search: results as Workflow.filter"""
+    index.update(DATA)
+    # queries whose matches all begin a word of the search key
+    for query in ('the splits', 'trials', 'ets', 'two', 'is', 'item', 'spl',
+                  'xyz'):
+        expected = wf.filter(query, DATA, include_score=True,
+                             match_on=MATCH_ALL ^ MATCH_ALLCHARS)
+        assert index.search(query, include_score=True) == expected
+
+
+def test_search_options(index):
+    """Search: options"""
+    index.update(DATA)
+    assert index.search('test', max_results=2) == [
+        'the extra special trials', 'TwoExtraSpecialTests']
+    assert index.search('test', match_on=MATCH_CAPITALS) == [
+        'TwoExtraSpecialTests']
+    assert index.search('tes', match_on=MATCH_STARTSWITH, min_score=95) == [
+        'Test Item One', 'test item two']
+    assert index.search('tes', match_on=MATCH_STARTSWITH, min_score=96) == []
+    # words that don't start a word of the search key aren't found
+    assert 'not the extra special trials' not in index.search('test')
+    # empty query returns everything in insertion order
+    assert index.search('  ', max_results=0) == DATA
+    assert index.search('.,') == []
+
+
+def test_search_update(index):
+    """Search: add, replace and delete items"""
+    books = [
+        {'id': 1, 'title': 'The Kraken Wakes'},
+        {'id': 2, 'title': 'Brave New World'},
+        {'id': 3, 'title': 'Die Blechtrommel'},
+    ]
+    index.update(books, key=lambda b: b['title'], uid=lambda b: '%d' % b['id'])
+    assert len(index) == 3
+    assert '2' in index
+    assert index.get('2') == books[1]
+    assert index.search('wor') == [books[1]]
+
+    index.add('2', 'Straße der Ölsardinen',
+              {'id': 2, 'title': 'Straße der Ölsardinen'})
+    assert len(index) == 3
+    assert index.search('wor') == []
+    # keys and queries are folded to ASCII
+    assert index.search('strasse ol') == [index.get('2')]
+    assert index.search('ölsar') == [index.get('2')]
+
+    index.delete('1', '4')
+    assert len(index) == 2
+    assert '1' not in index
+    assert index.get('1', 'default') == 'default'
+    assert index.search('kraken') == []
+
+    index.add('bt', 'Die Blechtrommel')
+    assert index.search('blech') == [books[2], 'Die Blechtrommel']
+
+    index.clear()
+    assert len(index) == 0
+    assert index.search('blech') == []
+
+
+def test_search_unicode(wf, index):
+    """Search: non-ASCII queries"""
+    cities = ['北京 Beijing', '東京 Tokyo', 'München', 'Zürich 🏔']
+    index.update(cities)
+    # non-ASCII queries are matched against unfolded keys
+    assert index.search('北京') == ['北京 Beijing']
+    assert index.search('東', include_score=True) == wf.filter(
+        '東', cities, include_score=True,
+        match_on=MATCH_ALL ^ MATCH_ALLCHARS)
+    assert index.search('münch') == ['München']
+    assert index.search('上海') == []
+    # queries without word characters match substrings
+    assert index.search('🏔') == ['Zürich 🏔']
+    assert index.search('🌊') == []
+    # ASCII queries are matched against folded keys
+    assert index.search('munchen') == ['München']
+    assert index.search('zur') == ['Zürich 🏔']
+
+
+def test_search_persistent(wf):
+    """Search: data saved"""
+    index = wf.search_index('books')
+    index.add('1', 'Brave New World')
+    index.close()
+    assert os.path.exists(wf.datafile('books.sqlite'))
+
+    with wf.search_index('books') as index:
+        assert index.search('bnw', include_score=True) == [
+            ('Brave New World', 99.0, MATCH_CAPITALS)]
+
+
+if __name__ == '__main__':  # pragma: no cover
+    pytest.main([__file__])
@@ -25,6 +25,7 @@ from workflow.util import (
     applescriptify,
     browse_in_alfred,
     jxa_app_name,
+    LRUCache,
     reload_workflow,
     run_applescript,
     run_command,
@@ -420,5 +421,61 @@ def test_appinfo():
     assert info is None
 
 
+def test_lru_cache():
+    """LRU cache discards least recently used items"""
+    cache = LRUCache(2)
+    cache['a'] = 1
+    cache['b'] = 2
+    assert len(cache) == 2
+    assert cache.get('a') == 1  # 'b' now least recently used
+    cache['c'] = 3
+    assert len(cache) == 2
+    assert 'b' not in cache
+    assert cache.get('b') is None
+    assert cache.get('b', 'x') == 'x'
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert (cache.hits, cache.misses) == (3, 2)
+
+    # replacing an item doesn't grow the cache
+    cache['c'] = 4
+    assert len(cache) == 2
+    assert cache.get('c') == 4
+
+    assert cache.pop('c') == 4
+    assert cache.pop('c', 'x') == 'x'
+    assert 'c' not in cache
+
+    cache.clear()
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (0, 0)
+
+
+def test_lru_cache_maxbytes():
+    """LRU cache limited by size of items"""
+    cache = LRUCache(10, maxbytes=100)
+    cache.set('a', 1, 40)
+    cache.set('b', 2, 40)
+    assert cache.size == 80
+    cache.get('a')
+    cache.set('c', 3, 40)  # discards 'b'
+    assert 'b' not in cache
+    assert cache.size == 80
+
+    # replacing an item replaces its size
+    cache.set('c', 4, 10)
+    assert cache.size == 50
+    assert cache.pop('c') == 4
+    assert cache.size == 40
+
+    # too large to cache
+    cache.set('d', 5, 101)
+    assert 'd' not in cache
+    assert cache.get('a') == 1
+
+    cache.clear()
+    assert cache.size == 0
+
+
 if __name__ == '__main__':  # pragma: no cover
     pytest.main([__file__])
@@ -310,6 +310,30 @@ def test_clear_session_cache(infopl):
     assert wf.cached_data('data', session=False) == data
 
 
+def test_session_filter(infopl):
+    """Workflow3: session-scoped incremental filter."""
+    wf = Workflow3()
+    items = ['google', 'goo goo dolls', 'good', 'bogof', 'golf', 'gogo']
+    for query in ('g', 'go', 'goo', 'goog', 'goo g', 'goo go', 'o', ''):
+        for include_score in (False, True):
+            assert (wf.filter(query, items, session=True,
+                              include_score=include_score) ==
+                    wf.filter(query, items, include_score=include_score))
+
+    wf.clear_session_cache(True)
+    wf.filter('goo', items, session=True)
+    # Only items that matched "goo" are tested against "goog",
+    # so altering other items has no effect
+    items2 = list(items)
+    items2[4] = 'googol'
+    assert 'googol' not in wf.filter('goog', items2, session=True)
+    # Unrelated query tests all items
+    assert 'googol' in wf.filter('gol', items2, session=True)
+    # Items changed
+    assert wf.filter('golf', ['golf'] + items2, session=True) == ['golf']
+    wf.clear_session_cache(True)
+
+
 def test_modifiers(infopl):
     """Item3: Modifiers."""
     wf = Workflow3()
@@ -8,13 +8,17 @@
 
 from __future__ import print_function, unicode_literals
 
+import cPickle
 import json
+import multiprocessing
 import os
 import time
 
 import pytest
 
+import workflow.workflow
 from workflow import manager, Workflow
+from workflow.util import LockFile, LRUCache
 
 from conftest import env, ENV_V4, ENV_V2
 
@@ -165,6 +169,171 @@ def test_cache_expires(wf):
     assert called['called'] is True
 
 
+def test_cached_data_revalidate(wf, monkeypatch):
+    """Cached data: stale data returned while updating"""
+    from workflow import background
+    jobs = []
+    monkeypatch.setattr(background, 'run_in_background',
+                        lambda name, args: jobs.append((name, args)))
+    cmd = ['/usr/bin/python', 'update.py']
+
+    # no data yet
+    assert wf.cached_data('test', max_age=10, revalidate=cmd) is None
+    assert jobs == [('__workflow_revalidate_test', cmd)]
+    assert wf.revalidating == {'test'}
+    wf.revalidating.clear()
+    assert wf.cached_data('test', lambda: 'new', 10, revalidate=cmd) == 'new'
+    assert len(jobs) == 1
+
+    # fresh data
+    assert wf.cached_data('test', lambda: 'newer', 10, cmd) == 'new'
+    assert len(jobs) == 1
+    assert not wf.revalidating
+
+    # stale data
+    path = wf.cachefile('test.cpickle')
+    os.utime(path, (time.time() - 20, time.time() - 20))
+    assert wf.cached_data('test', lambda: 'newer', 10, cmd) == 'new'
+    assert len(jobs) == 2
+    assert wf.revalidating == {'test'}
+    assert wf.cached_data('test', lambda: 'newer', 10) == 'newer'
+
+
+def test_memory_cache(wf, monkeypatch):
+    """Cached and stored data kept in memory"""
+    monkeypatch.setattr(workflow.workflow, '_memory_cache', None)
+    assert wf.memory_cache is None
+    wf.memory_cache = LRUCache(2)
+    assert Workflow().memory_cache is wf.memory_cache
+    wf.cache_data('test', [1, 2])
+    wf.store_data('test', {'a': 1}, serializer='json')
+
+    data = wf.cached_data('test', max_age=0)
+    assert data == [1, 2]
+    assert wf.cached_data('test', max_age=0) is data
+    stored = wf.stored_data('test')
+    assert stored == {'a': 1}
+    assert wf.stored_data('test') is stored
+    assert wf.memory_cache.hits == 2
+
+    # saving data replaces them
+    wf.cache_data('test', [3])
+    assert wf.cached_data('test', max_age=0) == [3]
+    wf.store_data('test', None)
+    assert wf.stored_data('test') is None
+
+    # file changed by another process
+    data = wf.cached_data('test', max_age=0)
+    with open(wf.cachefile('test.cpickle'), 'wb') as fp:
+        cPickle.dump([4, 5], fp)
+    assert wf.cached_data('test', max_age=0) == [4, 5]
+
+    # explicit invalidation
+    data = wf.cached_data('test', max_age=0)
+    wf.clear_memory_cache('test')
+    assert wf.cached_data('test', max_age=0) is not data
+    wf.clear_memory_cache()
+    assert len(wf.memory_cache) == 0
+    wf.cached_data('test', max_age=0)
+    wf.clear_cache()
+    assert len(wf.memory_cache) == 0
+
+    # limited by size of files
+    wf.memory_cache = LRUCache(10, maxbytes=1000)
+    wf.cache_data('small', range(10))
+    wf.cache_data('large', range(1000))
+    wf.cached_data('small', max_age=0)
+    wf.cached_data('large', max_age=0)
+    assert len(wf.memory_cache) == 1
+    assert 0 < wf.memory_cache.size < 1000
+
+
+def _hold_lock(path, locked, seconds, data):
+    """Lock cache file ``path``, then save ``data`` after ``seconds``."""
+    with LockFile(path):
+        locked.set()
+        time.sleep(seconds)
+        if data is not None:
+            with open(path, 'wb') as fp:
+                cPickle.dump(data, fp)
+
+
+def _locked_by_other_process(path, seconds=0.5, data=None):
+    """Start process that locks ``path``."""
+    locked = multiprocessing.Event()
+    p = multiprocessing.Process(target=_hold_lock,
+                                args=(path, locked, seconds, data))
+    p.start()
+    locked.wait()
+    return p
+
+
+def test_cached_data_contention(wf):
+    """Cached data: only one process regenerates data"""
+    path = wf.cachefile('test.cpickle')
+    calls = []
+
+    def getdata():
+        calls.append(1)
+        return 'new'
+
+    # off by default
+    assert wf.cache_lock_timeout is None
+    wf.cache_data('test', None)
+    p = _locked_by_other_process(path)
+    assert wf.cached_data('test', getdata, max_age=10) == 'new'
+    p.join()
+    assert calls == [1]
+    del calls[:]
+    wf.cache_lock_timeout = 10.0
+
+    # stale data are returned
+    wf.cache_data('test', 'old')
+    os.utime(path, (time.time() - 20, time.time() - 20))
+    p = _locked_by_other_process(path)
+    assert wf.cached_data('test', getdata, max_age=10) == 'old'
+    p.join()
+    assert not calls
+    assert wf.cache_stats == dict(contended=1, stale=1, waited=0, timeouts=0)
+
+    # wait for other process's data
+    wf.cache_data('test', None)
+    p = _locked_by_other_process(path, data='other')
+    assert wf.cached_data('test', getdata, max_age=10) == 'other'
+    p.join()
+    assert not calls
+    assert wf.cache_stats['waited'] == 1
+
+    # time out
+    wf.cache_data('test', None)
+    wf.cache_lock_timeout = 0.2
+    p = _locked_by_other_process(path, seconds=1)
+    assert wf.cached_data('test', getdata, max_age=10) == 'new'
+    p.join()
+    assert calls == [1]
+    assert wf.cache_stats == dict(contended=3, stale=1, waited=1, timeouts=1)
+
+    # don't wait at all
+    wf.cache_data('test', None)
+    wf.cache_lock_timeout = 0
+    p = _locked_by_other_process(path, seconds=1)
+    start = time.time()
+    assert wf.cached_data('test', getdata, max_age=10) == 'new'
+    assert time.time() - start < 0.5
+    p.join()
+    assert calls == [1, 1]
+    assert wf.cache_stats == dict(contended=4, stale=1, waited=1, timeouts=2)
+
+    # no contention
+    assert wf.cached_data('test', getdata, max_age=-1) == 'new'
+    assert calls == [1, 1, 1]
+    assert wf.cache_stats['contended'] == 4
+    assert not os.path.exists(path + '.lock')
+    # one lock per cache file
+    assert set(wf._cache_locks) == {
+        path, wf.cachefile('__workflow_cache_stats.json')}
+
+
 def test_cache_fresh(wf):
     """Cached data is fresh"""
     data = 'This is my data'
@@ -8,11 +8,29 @@
 
 from __future__ import print_function, unicode_literals
 
+import cPickle
+import os
+import re
+import sys
+
 import pytest
 
+import workflow.workflow
+from workflow.util import LRUCache
 from workflow.workflow import (
+    FilterIndex,
+    FilterProfile,
+    _atoms,
+    _char_mask,
+    _edit_distance,
+    _match_allchars,
+    _query_narrows,
+    _FILTER_CACHE_SIZE,
+    _search_for_query,
+    _search_patterns,
+    Workflow,
     MATCH_ALL, MATCH_ALLCHARS,
-    MATCH_ATOM, MATCH_CAPITALS, MATCH_STARTSWITH,
+    MATCH_ATOM, MATCH_CAPITALS, MATCH_FUZZY_TYPO, MATCH_STARTSWITH,
     MATCH_SUBSTRING, MATCH_INITIALS_CONTAIN,
     MATCH_INITIALS_STARTSWITH,
 )
@@ -104,6 +122,33 @@ def test_filter_max_results(wf):
     assert len(results) == 4
 
 
+def test_filter_max_results_order(wf):
+    """Filter: max results same as truncated results"""
+    data = ['bob', 'bobby', 'bobby smith', 'bob', 'Bob', 'robert',
+            'bobsleigh', 'bo b', 'obo', 'bobbob']
+    for ascending in (False, True):
+        for min_score in (0, 50):
+            results = wf.filter('bo', data, include_score=True,
+                                ascending=ascending, min_score=min_score)
+            for n in range(1, len(data) + 2):
+                assert wf.filter('bo', data, include_score=True,
+                                 ascending=ascending, min_score=min_score,
+                                 max_results=n) == results[:n]
+
+
+def test_filter_prune(wf):
+    """Filter: skipping MATCH_ALLCHARS doesn't change results"""
+    data = ['the splits', 'this', 'Test Item', 'tests', 'a' * 500,
+            'the extra special trials', 'intestinal', 'thes', 'tis']
+    data = data * 3 + ['t s'] + data
+    for query in ('ts', 'tis', 't', 'tests', 'a', 't s'):
+        for min_score, max_results in ((0, 1), (0, 3), (20, 0), (30, 5)):
+            args = (query, data, lambda x: x, False, True, min_score,
+                    max_results, MATCH_ALL, True)
+            results, _ = wf._filter(*args, prune=False)
+            assert wf.filter(*args) == results
+
+
 def test_filter_min_score(wf):
     """Filter: min score"""
     results = wf.filter('test', SEARCH_ITEMS, key=lambda x: x[0],
@@ -197,11 +242,557 @@ def test_filter_reversed_results(wf):
     assert results == data[::-1]
 
 
+def test_filter_index(wf):
+    """Filter: index gives same results as list"""
+    index = FilterIndex(SEARCH_ITEMS, key=lambda x: x[0])
+    assert len(index) == len(SEARCH_ITEMS)
+    for match_on in (MATCH_ALL, MATCH_ALL ^ MATCH_ALLCHARS,
+                     MATCH_CAPITALS, MATCH_ATOM | MATCH_SUBSTRING):
+        for query in ('test', 'tes t', 'tst', 'tet', 'splits'):
+            expected = wf.filter(query, SEARCH_ITEMS, key=lambda x: x[0],
+                                 include_score=True, match_on=match_on)
+            results = wf.filter(query, index, include_score=True,
+                                match_on=match_on)
+            assert results == expected
+
+
+def test_filter_index_folding(wf):
+    """Filter: index with diacritic folding"""
+    keys = [key for key, _ in SEARCH_ITEMS_DIACRITICS]
+    index = FilterIndex(keys)
+    for _, query in SEARCH_ITEMS_DIACRITICS:
+        for fold in (True, False):
+            expected = wf.filter(query, keys, include_score=True,
+                                 fold_diacritics=fold)
+            results = wf.filter(query, index, include_score=True,
+                                fold_diacritics=fold)
+            assert results == expected
+
+    data = ['fühler', 'fuhler', 'fübar', 'fubar']
+    assert wf.filter('fü', FilterIndex(data)) == wf.filter('fü', data)
+
+
+def test_char_mask():
+    """Filter: character bitmask"""
+    for text, other, subset in [
+        ('test', 'this is a test', True),
+        ('tset', 'test', True),
+        ('tests', 'test', True),
+        ('test!', 'test', False),
+        ('fü', 'fühler', True),
+        ('fü', 'fubar', False),
+        ('мир', 'мирный', True),
+        ('мир', 'миф', False),
+    ]:
+        mask, other_mask = _char_mask(text), _char_mask(other)
+        assert (mask & other_mask == mask) is subset
+
+
+def test_match_allchars():
+    """Filter: MATCH_ALLCHARS matcher is equivalent to regex"""
+    values = ['', 'a', 'ab', 'AB', 'ba', 'xaxb', 'a\nb', 'xa\nab',
+              'xab\nab', 'a\n\nab\n', 'Über', 'über', 'ÜBER', 'kK',
+              'a.b*c', 'a' * 200]
+    for query in ('a', 'ab', 'aab', 'b', 'üb', 'ber', 'k', '.*', 'b*c'):
+        regex = re.compile(''.join(['.*?' + re.escape(c) for c in query]),
+                           re.IGNORECASE)
+        for value in values:
+            m = regex.search(value)
+            expected = m.span() if m else None
+            assert _match_allchars(query, value, value.lower()) == expected
+
+
+def test_filter_index_unicode(wf):
+    """Filter: index with non-ASCII queries"""
+    data = ['Мирный', 'мир', 'Миф', 'мор', 'fühler', 'Führer', 'fuhler']
+    index = FilterIndex(data)
+    for query in ('мир', 'ми', 'мо р', 'fü', 'fu', 'hl'):
+        assert (wf.filter(query, index, include_score=True) ==
+                wf.filter(query, data, include_score=True))
+
+
+def test_filter_index_empty(wf):
+    """Filter: index with empty keys and query"""
+    data = ['bob', ' ', 'henry']
+    index = FilterIndex(data)
+    assert wf.filter('', index) == data
+    assert wf.filter('  ', index) == data
+    assert wf.filter('b', index) == ['bob']
+    assert list(index) == data
+
+
+def test_filter_index_cached(wf):
+    """Filter: index can be cached"""
+    index = FilterIndex(SEARCH_ITEMS, key=lambda x: x[0])
+    wf.cache_data('index', index)
+    index2 = wf.cached_data('index', max_age=0)
+    assert isinstance(index2, FilterIndex)
+    assert index2.items == index.items
+    assert (wf.filter('test', index2, include_score=True) ==
+            wf.filter('test', index, include_score=True))
+
+
+def test_filter_index_numpy(wf):
+    """Filter: NumPy index gives same results as list"""
+    pytest.importorskip('numpy')
+    data = ([key for key, _ in SEARCH_ITEMS + SEARCH_ITEMS_DIACRITICS] +
+            ['Мирный', 'мир', 'fühler', 'Führer', '', ' ', 'a' * 200,
+             'ab ' * 50, 'Bob', 'bob', 'bobby'])
+    index = FilterIndex(data, use_numpy=True)
+    assert index.vectorized
+    for match_on in (MATCH_ALL, MATCH_ALL ^ MATCH_ALLCHARS,
+                     MATCH_CAPITALS, MATCH_ATOM | MATCH_SUBSTRING,
+                     MATCH_INITIALS_CONTAIN):
+        for query in ('test', 'tes t', 'tst', 'splits', 'av', 'fü', 'мир',
+                      'a', 'ab', 'bob', 'b o', 'oaf', 'xyz'):
+            for kwargs in ({}, {'max_results': 3}, {'min_score': 50},
+                           {'fold_diacritics': False}):
+                expected = wf.filter(query, data, include_score=True,
+                                     match_on=match_on, **kwargs)
+                results = wf.filter(query, index, include_score=True,
+                                    match_on=match_on, **kwargs)
+                assert results == expected
+
+
+def test_filter_index_no_numpy(wf, monkeypatch):
+    """Filter: index falls back to Python without NumPy"""
+    monkeypatch.setitem(sys.modules, 'workflow.vectorized', None)
+    index = FilterIndex(SEARCH_ITEMS, key=lambda x: x[0], use_numpy=True)
+    assert not index.vectorized
+    assert (wf.filter('test', index, include_score=True) ==
+            wf.filter('test', SEARCH_ITEMS, key=lambda x: x[0],
+                      include_score=True))
+
+
+def test_filter_index_trigrams(wf):
+    """Filter: trigram index gives same results as list"""
+    data = ([key for key, _ in SEARCH_ITEMS + SEARCH_ITEMS_DIACRITICS] +
+            ['Мирный', 'мир', 'fühler', 'Führer', '', 'bobby', 'Bob'])
+    index = FilterIndex(data, trigrams=True)
+    for match_on in (MATCH_SUBSTRING, MATCH_STARTSWITH | MATCH_ATOM,
+                     MATCH_STARTSWITH | MATCH_ATOM | MATCH_SUBSTRING,
+                     MATCH_ALL):
+        for query in ('test', 'tes t', 'est ite', 'item', 'splits', 'füh',
+                      'fuh', 'мир', 'bob', 'bo', 'ungen', 'xyz'):
+            for fold in (True, False):
+                expected = wf.filter(query, data, include_score=True,
+                                     match_on=match_on, fold_diacritics=fold)
+                results = wf.filter(query, index, include_score=True,
+                                    match_on=match_on, fold_diacritics=fold)
+                assert results == expected
+
+    assert index._candidates('item', MATCH_SUBSTRING, True) == [0, 1]
+    assert index._candidates('xyz', MATCH_SUBSTRING, True) == []
+    # words too short or rules not based on substrings
+    assert index._candidates('it', MATCH_SUBSTRING, True) is None
+    assert index._candidates('item', MATCH_ALL, True) is None
+
+
+def test_filter_index_cache(wf):
+    """Filter: cached index rebuilt when data change"""
+    data = ['bob', 'bobby', 'henry']
+    calls = []
+
+    def load():
+        calls.append(1)
+        return data
+
+    index = wf.filter_index('people', data, trigrams=True)
+    assert wf.filter('bob', index) == ['bob', 'bobby']
+    assert wf.filter_index('people', data, trigrams=True).items == data
+
+    data = data + ['bobsleigh']
+    index = wf.filter_index('people', data, trigrams=True)
+    assert wf.filter('bob', index) == ['bob', 'bobby', 'bobsleigh']
+    # search keys changed
+    index = wf.filter_index('people', data, key=lambda s: s[::-1])
+    assert wf.filter('ybb', index) == ['bobby']
+
+    # items only loaded when version changes
+    for version in (1, 1, 2, 2):
+        index = wf.filter_index('people', load, version=version)
+        assert index.items == data
+    assert len(calls) == 2
+
+
+def test_query_narrows():
+    """Filter: extended queries narrow results"""
+    data = [
+        # previous, query, match_on, expected
+        ('goo', 'goog', MATCH_ALL, True),
+        ('goo', 'goo', MATCH_ALL, True),
+        ('goo', 'goo b', MATCH_ALL, True),
+        ('goo  ba', 'goo bar', MATCH_ALL, True),
+        ('Goo', 'gOOg', MATCH_ALL, True),
+        ('goog', 'goo', MATCH_ALL, False),
+        ('goo', 'gog', MATCH_ALL, False),
+        ('goo bar', 'goo', MATCH_ALL, False),
+        ('fu', 'fü', MATCH_ALL, False),
+        ('', 'goo', MATCH_ALL, False),
+        ('goo', 'goog', MATCH_ATOM, False),
+        ('goo', 'goog', MATCH_ATOM | MATCH_ALLCHARS, False),
+        ('goo', 'goog', MATCH_ATOM | MATCH_SUBSTRING, True),
+        ('goo', 'goog', MATCH_CAPITALS, True),
+        ('goog', 'googl', MATCH_ALL | MATCH_FUZZY_TYPO, False),
+    ]
+    for previous, query, match_on, expected in data:
+        assert _query_narrows(previous, query, match_on) is expected
+
+
 def test_punctuation(wf):
     """Punctuation: dumbified"""
     for input, output in PUNCTUATION_DATA:
         assert wf.dumbify_punctuation(input) == output
 
 
+def test_text_cache(wf):
+    """Filter: folded and dumbified text cached"""
+    wf.text_cache = LRUCache(2)
+    assert wf.fold_to_ascii('Fußpilz') == 'Fusspilz'
+    assert wf.fold_to_ascii('Fußpilz') == 'Fusspilz'
+    assert wf.dumbify_punctuation('“test”') == '"test"'
+    assert wf.dumbify_punctuation('“test”') == '"test"'
+    # ASCII text isn't cached
+    assert wf.fold_to_ascii('test') == 'test'
+    assert (wf.text_cache.hits, wf.text_cache.misses) == (2, 2)
+
+    assert wf.fold_to_ascii('salé') == 'sale'
+    assert len(wf.text_cache) == 2
+    assert ('fold', 'Fußpilz') not in wf.text_cache
+
+
+def test_filter_parallel(wf):
+    """Filter: parallel filtering"""
+    data = [t[0] for t in SEARCH_ITEMS] * 5 + ['', ' ', 'The Splits']
+    index = FilterIndex(data)
+    wf.filter_processes = 3
+    for query in ('test', 'ts', 'the splits', 'xyz'):
+        for kwargs in ({}, {'max_results': 4}, {'min_score': 50},
+                       {'ascending': True, 'include_score': True}):
+            wf.filter_parallel_min = 0
+            expected = wf.filter(query, data, **kwargs)
+            wf.filter_parallel_min = len(data)
+            assert wf.filter(query, data, **kwargs) == expected
+            assert wf.filter(query, index, **kwargs) == expected
+
+
+def test_filter_parallel_fallback(wf, monkeypatch):
+    """Filter: serial filtering if parallel job can't be pickled"""
+    data = [{'title': t[0]} for t in SEARCH_ITEMS] * 5
+    assert wf.filter_parallel_min == 0
+    expected = wf.filter('ts', data, key=lambda d: d['title'])
+    assert expected
+
+    def chunk(bounds):  # can't be pickled
+        raise AssertionError('unreachable')
+
+    parent = os.getpid()
+
+    def key(d):
+        if os.getpid() != parent:
+            raise TypeError('error in worker')
+        return d['title']
+
+    # errors in workers aren't mistaken for pickling errors
+    wf.filter_processes = 2
+    wf.filter_parallel_min = len(data)
+    with pytest.raises(TypeError) as err:
+        wf.filter('ts', data, key=key)
+    assert 'error in worker' in str(err.value)
+
+    monkeypatch.setattr(workflow.workflow, '_filter_chunk', chunk)
+    assert wf.filter('ts', data, key=lambda d: d['title']) == expected
+
+
+def test_edit_distance():
+    """Filter: Damerau-Levenshtein distance"""
+    for a, b, limit, d in [
+            ('firefox', 'firefox', 2, 0),
+            ('firefox', 'fierfox', 2, 1),  # transposition
+            ('firefox', 'firefx', 2, 1),  # deletion
+            ('firefox', 'firefoxx', 2, 1),  # insertion
+            ('firefox', 'firebox', 2, 1),  # substitution
+            ('firefox', 'fierfx', 2, 2),
+            ('firefox', 'fierfx', 1, None),
+            ('firefox', 'safari', 2, None),
+            ('ca', 'abc', 3, 3),  # not 2: substrings are edited once
+            ('', 'ab', 2, 2)]:
+        assert _edit_distance(a, b, limit) == d
+        assert _edit_distance(b, a, limit) == d
+
+
+def test_filter_typos(wf):
+    """Filter: MATCH_FUZZY_TYPO"""
+    data = ['Firefox', 'Mozilla Firefox Nightly', 'Fire', 'Safari',
+            'Thunderbird', 'fierfox', 'Fußball']
+    match_on = MATCH_ALL | MATCH_FUZZY_TYPO
+    # not part of MATCH_ALL
+    assert wf.filter('firefix', data) == []
+
+    indices = (data, FilterIndex(data), FilterIndex(data, typos=True))
+    for items in indices:
+        results = wf.filter('firfox', items, match_on=match_on,
+                            include_score=True)
+        assert results == [
+            ('fierfox', 79.0, MATCH_FUZZY_TYPO),
+            ('Firefox', 79.0, MATCH_FUZZY_TYPO),
+            ('Mozilla Firefox Nightly', 77.0, MATCH_FUZZY_TYPO),
+        ]
+
+        # exact matches score higher
+        assert wf.filter('fierfox', items, match_on=match_on) == [
+            'fierfox', 'Firefox', 'Mozilla Firefox Nightly']
+        # two typos in long words
+        assert wf.filter('tunderbrid', items, match_on=match_on) == [
+            'Thunderbird']
+        assert wf.filter('tunderbrx', items, match_on=match_on) == []
+        # short words must be correct
+        assert wf.filter('frie', items, match_on=MATCH_FUZZY_TYPO) == [
+            'Fire']
+        assert wf.filter('fri', items, match_on=MATCH_FUZZY_TYPO) == []
+        # folded search keys
+        assert wf.filter('fussbal', items, match_on=match_on) == [
+            'Fußball']
+        # other words match as usual
+        assert wf.filter('mozila nightly', items, match_on=match_on) == [
+            'Mozilla Firefox Nightly']
+
+
+def test_filter_fields(wf):
+    """Filter: multiple weighted keys"""
+    books = [
+        ('Animal Farm', 'George Orwell'),
+        ('Nineteen Eighty-Four', 'George Orwell'),
+        ('Farmer Giles of Ham', 'J. R. R. Tolkien'),
+        ('', 'Anonymous'),
+    ]
+    fields = [(lambda b: b[0], 2), (lambda b: b[1], 1)]
+
+    # words may match different fields
+    results = wf.filter('orwell farm', books, key=fields,
+                        include_score=True)
+    assert results == [(books[0], 98.0 + 2 * 98.0, MATCH_ATOM)]
+
+    # best weighted score counts
+    results = wf.filter('g', books, key=fields, include_score=True)
+    assert results == [
+        (books[2], 2 * 91.0, MATCH_INITIALS_CONTAIN),
+        (books[1], 2 * 70.0, MATCH_SUBSTRING),
+        (books[0], 87.0, MATCH_STARTSWITH),
+    ]
+
+    # items with the same score are sorted by the first key
+    assert wf.filter('george', books, key=fields) == [books[0], books[1]]
+    assert wf.filter('anon', books, key=fields) == [books[3]]
+
+    # single field is the same as `key`
+    for query in ('test', 'ts', 'the splits', 'xyz'):
+        expected = wf.filter(query, SEARCH_ITEMS, key=lambda t: t[0],
+                             include_score=True)
+        assert wf.filter(query, SEARCH_ITEMS, key=[(lambda t: t[0], 1)],
+                         include_score=True) == expected
+
+
+def test_filter_cache(wf, monkeypatch):
+    """Filter: cached results"""
+    data = [{'title': t[0], 'id': i} for i, t in enumerate(SEARCH_ITEMS)]
+    index = FilterIndex(data, key=lambda d: d['title'])
+    profile = wf.filter_profile = FilterProfile()
+
+    def check(query, items, hit, **kwargs):
+        n = len(profile.calls)
+        kwargs.setdefault('key', lambda d: d['title'])
+        cache = kwargs.pop('cache', True)
+        results = wf.filter(query, items, cache=cache, **kwargs)
+        assert len(profile.calls) == n + (0 if hit else 1)
+        expected = wf.filter(query, items, **kwargs)
+        assert results == expected
+        return results
+
+    check('test', data, False)
+    check('test', data, True)
+    check('test', data, True, include_score=True)
+    check('  test ', data, True)
+    check('test', data, False, max_results=2)
+    check('test', data, False, match_on=MATCH_ALL ^ MATCH_ALLCHARS)
+    check('test', data, False, key=[(lambda d: d['title'], 2)])
+    check('test', data, False, boost=lambda d: d['id'])
+    check('test', data, False, boost=lambda d: d['id'])
+    assert wf.filter('', data, cache=True) == data
+
+    check('item', index, False)
+    check('item', index, True)
+    # a copy of the index (e.g. loaded from the cache) is the same
+    check('item', cPickle.loads(cPickle.dumps(index, -1)), True)
+    check('item', FilterIndex(data, key=lambda d: d['title']), False)
+    check('item', data, False)
+
+    # version of items
+    check('item', data, False, cache=1)
+    check('item', data, True, cache=1)
+    check('item', data, False, cache=2)
+    check('item', data[:-1], False, cache=2)
+    # different keys with the same version
+    check('item', data, False, cache=2, key=lambda d: unicode(d['id']))
+    check('item', data, True, cache=2)
+    check('1', data, False, cache=2)
+    check('1', data, False, cache=2, key=lambda d: unicode(d['id']))
+    check('1', data, True, cache=2, key=lambda d: unicode(d['id']))
+
+    def key_for(field):
+        return lambda d: unicode(d[field])
+
+    check('1', data, False, cache=2, key=key_for('title'))
+    check('1', data, False, cache=2, key=key_for('id'))
+    check('1', data, True, cache=2, key=key_for('id'))
+
+    # items are looked up in the new list
+    copies = [dict(d, copy=True) for d in data]
+    results = check('test', copies, True)
+    assert results and all([d['copy'] for d in results])
+    # search keys changed
+    check('test', data + [{'title': 'test', 'id': 99}], False)
+
+    # only the latest queries are cached
+    for i in range(_FILTER_CACHE_SIZE):
+        check('test%d' % i, data, False)
+    check('test', data, False)
+    check('test%d' % (_FILTER_CACHE_SIZE - 1), data, True)
+
+    # results of old queries are dropped if there are too many
+    monkeypatch.setattr(workflow.workflow, '_FILTER_CACHE_MAX_HITS', 5)
+    assert len(wf.filter('e', data, key=lambda d: d['title'])) > 5
+    check('e', data, False)
+    check('e', data, False)
+    assert wf.cached_data('__workflow_filter_results', max_age=0) == []
+    check('twoextra', data, False)
+    check('twoextra', data, True)
+
+
+def test_ifilter(wf):
+    """Filter: streaming items"""
+    data = [t[0] for t in SEARCH_ITEMS] * 3 + ['', ' ', 'The Splits']
+    for query in ('test', 'ts', 'the splits', 'xyz'):
+        for kwargs in ({}, {'max_results': 4}, {'min_score': 50},
+                       {'ascending': True, 'include_score': True},
+                       {'ascending': True, 'max_results': 2}):
+            expected = wf.filter(query, data, **kwargs)
+            for batch_size in (1, 7, 1000):
+                results = wf.ifilter(query, iter(data),
+                                     batch_size=batch_size, **kwargs)
+                assert list(results) == expected
+
+    # empty queries don't wait for the end of `items`
+    def gen():
+        yield 'one'
+        raise AssertionError('items read too far')
+
+    assert next(wf.ifilter('  ', gen())) == 'one'
+
+
+def test_filter_profile(wf):
+    """Filter: profiling"""
+    data = [t[0] for t in SEARCH_ITEMS]
+    index = FilterIndex(data, key=lambda x: x, typos=True)
+    queries = ('test', 'ts', 'the splits', 'tset', 'xyz', 'ünï')
+    expected = []
+    for items in (data, index):
+        for match_on in (MATCH_ALL, MATCH_ALL | MATCH_FUZZY_TYPO,
+                         MATCH_ALL ^ MATCH_STARTSWITH):
+            for query in queries:
+                expected.append(wf.filter(query, items, include_score=True,
+                                          match_on=match_on))
+
+    # results are the same
+    profile = wf.filter_profile = FilterProfile()
+    results = []
+    for items in (data, index):
+        for match_on in (MATCH_ALL, MATCH_ALL | MATCH_FUZZY_TYPO,
+                         MATCH_ALL ^ MATCH_STARTSWITH):
+            for query in queries:
+                results.append(wf.filter(query, items, include_score=True,
+                                         match_on=match_on))
+    assert results == expected
+    assert len(profile.calls) == len(expected)
+
+    fields = [(lambda x: x, 2), (lambda x: x.upper(), 1)]
+    wf.filter_profile = None
+    expected = wf.filter('tis', data, key=fields, include_score=True)
+    wf.filter_profile = profile
+    assert wf.filter('tis', data, key=fields, include_score=True) == expected
+
+    stats = profile.calls[-1]
+    assert stats['query'] == 'tis'
+    assert stats['items'] == len(data)
+    assert stats['results'] == len(expected)
+    assert stats['cache_hits'] == 1 and stats['cache_misses'] == 0
+    assert stats['key'] > 0 and stats['fold'] > 0
+    # every word of every key of every item is tested
+    tested = sum([counts[1] + counts[2] for counts in stats['rules'].values()])
+    assert tested >= 2 * len(data)
+    assert stats['rules'][MATCH_ALLCHARS][1] > 0
+    assert MATCH_FUZZY_TYPO not in stats['rules']
+    assert 'MATCH_ALLCHARS' in profile.report()
+
+    # the pattern cache is shared, so use words no other test uses
+    wf.filter('profiled words', index)
+    stats = profile.calls[-1]
+    assert stats['cache_hits'] == 0 and stats['cache_misses'] == 2
+    # search keys are pre-computed
+    assert stats['key'] == 0 and stats['fold'] == 0
+    assert 'pattern cache: 0/2 hits (0%)' in profile.report()
+
+
+def test_search_pattern_cache(wf):
+    """Filter: MATCH_ALLCHARS matchers are cached"""
+    search = _search_for_query('cached matcher')
+    assert search('a cached matcher', 'a cached matcher') == (0, 16)
+    assert _search_for_query('cached matcher') is search
+
+    # cache is shared by workflows
+    wf.filter('cachedword', ['c a c h e d w o r d'])
+    assert 'cachedword' in _search_patterns
+    assert Workflow().filter('cachedword', ['c a c h e d w o r d']) == [
+        'c a c h e d w o r d']
+    assert _search_for_query('cachedword') is _search_for_query('cachedword')
+
+    # and bounded
+    for i in range(_search_patterns.maxsize):
+        _search_for_query('word%d' % i)
+    assert len(_search_patterns) == _search_patterns.maxsize
+    assert 'cachedword' not in _search_patterns
+
+
+def test_filter_unicode_atoms(wf):
+    """Filter: atoms, initials and capitals in any script"""
+    data = ['Москва Сити', 'ÉcoleNormale', 'snake_case_name', 'Ölsardinen',
+            'Get OmniFocus', 'HTMLParser', 'ПоискЯндекс']
+    for items in (data, FilterIndex(data), FilterIndex(data, use_numpy=True)):
+        def match(query):
+            results = wf.filter(query, items, include_score=True)
+            return [(t[0], t[2]) for t in results]
+
+        assert match('сити') == [('Москва Сити', MATCH_ATOM)]
+        assert match('мс') == [('Москва Сити', MATCH_CAPITALS)]
+        assert match('én') == [('ÉcoleNormale', MATCH_CAPITALS)]
+        assert match('case') == [('snake_case_name', MATCH_ATOM)]
+        assert match('scn') == [('snake_case_name',
+                                 MATCH_INITIALS_STARTSWITH)]
+        assert match('öls') == [('Ölsardinen', MATCH_STARTSWITH)]
+        # CamelCase words are split into atoms
+        assert match('focus') == [('Get OmniFocus', MATCH_ATOM)]
+        assert match('omnifocus') == [('Get OmniFocus', MATCH_ATOM)]
+        assert match('parser') == [('HTMLParser', MATCH_ATOM)]
+        assert match('яндекс') == [('ПоискЯндекс', MATCH_ATOM)]
+        assert match('normale') == [('ÉcoleNormale', MATCH_ATOM)]
+
+    # each atom once, in order
+    for value, atoms in [('MP3Player', ('mp3player', 'mp3', 'player')),
+                         ('OmniFocus', ('omnifocus', 'omni', 'focus')),
+                         ('ToDoToDo', ('todotodo', 'to', 'do')),
+                         ('mP', ('mp', 'm', 'p'))]:
+        assert _atoms(value, value.lower())[0] == atoms
+
+
 if __name__ == '__main__':  # pragma: no cover
     pytest.main([__file__])
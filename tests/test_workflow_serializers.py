@@ -12,7 +12,10 @@
 
 from __future__ import print_function, absolute_import
 
+import cPickle
+import gzip
 import os
+import zlib
 
 import pytest
 
@@ -21,12 +24,17 @@ from workflow.workflow import (
     JSONSerializer,
     CPickleSerializer,
     PickleSerializer,
+    CompressedSerializer,
+    lzma,
     manager as default_manager,
 )
 
 
 # default serializers
 SERIALIZERS = ('json', 'cpickle', 'pickle')
+COMPRESSED = ('json.gz', 'cpickle.gz', 'json.zlib', 'cpickle.zlib')
+if lzma is not None:
+    COMPRESSED += ('json.xz', 'cpickle.xz')
 
 
 @pytest.fixture(scope='function')
@@ -46,10 +54,33 @@ def is_serializer(obj):
 
 def test_default_serializers():
     """Default serializers."""
-    for name in SERIALIZERS:
+    for name in SERIALIZERS + COMPRESSED:
         assert is_serializer(default_manager.serializer(name))
 
-    assert set(SERIALIZERS) == set(default_manager.serializers)
+    assert (set(SERIALIZERS + COMPRESSED + ('columns',)) ==
+            set(default_manager.serializers))
+
+
+def test_compressed_serializers(tempdir):
+    """Compressed serializers"""
+    data = {'arg1': 'value1', 'list': range(20000), 'unicode': u'ünïcödé'}
+    for name in COMPRESSED:
+        serializer = default_manager.serializer(name)
+        path = os.path.join(tempdir, 'test.{0}'.format(name))
+        with open(path, 'wb') as file_obj:
+            serializer.dump(data, file_obj)
+
+        with open(path, 'rb') as file_obj:
+            assert serializer.load(file_obj) == data
+
+    # standard file formats
+    with gzip.open(os.path.join(tempdir, 'test.json.gz')) as file_obj:
+        assert JSONSerializer.load(file_obj) == data
+    with open(os.path.join(tempdir, 'test.cpickle.zlib'), 'rb') as file_obj:
+        assert cPickle.loads(zlib.decompress(file_obj.read())) == data
+
+    with pytest.raises(ValueError):
+        CompressedSerializer(JSONSerializer, 'bz2')
 
 
 def test_serialization(tempdir, manager):
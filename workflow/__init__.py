@@ -19,6 +19,9 @@ from .workflow3 import Variables, Workflow3
 # Exceptions
 from .workflow import PasswordNotFound, KeychainError
 
+# Filter index
+from .workflow import FilterIndex, FilterProfile
+
 # Icons
 from .workflow import (
     ICON_ACCOUNT,
@@ -52,6 +55,7 @@ from .workflow import (
     MATCH_ALLCHARS,
     MATCH_ATOM,
     MATCH_CAPITALS,
+    MATCH_FUZZY_TYPO,
     MATCH_INITIALS,
     MATCH_INITIALS_CONTAIN,
     MATCH_INITIALS_STARTSWITH,
@@ -71,6 +75,8 @@ __all__ = [
     'Workflow',
     'Workflow3',
     'manager',
+    'FilterIndex',
+    'FilterProfile',
     'PasswordNotFound',
     'KeychainError',
     'ICON_ACCOUNT',
@@ -100,6 +106,7 @@ __all__ = [
     'MATCH_ALLCHARS',
     'MATCH_ATOM',
     'MATCH_CAPITALS',
+    'MATCH_FUZZY_TYPO',
     'MATCH_INITIALS',
     'MATCH_INITIALS_CONTAIN',
     'MATCH_INITIALS_STARTSWITH',
@@ -0,0 +1,321 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# Copyright (c) 2026 Dean Jackson <deanishe@deanishe.net>
+#
+# MIT Licence. See http://opensource.org/licenses/MIT
+#
+# Created on 2026-10-17
+#
+
+"""Memory-mapped, column-oriented file format for lists of dicts.
+
+Most cached workflow data are a long list of dicts with the same keys
+(e.g. ``title``, ``subtitle``, ``arg`` and ``uid``). Unpickling such a
+list creates every string of every item, even though
+:meth:`Workflow.filter() <workflow.Workflow.filter>` only looks at one
+field and the workflow only shows a few results.
+
+:class:`ColumnarSerializer` saves each key's values in a separate
+column: an array of offsets and the UTF-8 encoded values. Loading the
+file :mod:`mmap`-s it and returns a :class:`Rows` sequence, whose rows
+only decode the values that are accessed.
+
+The serializer is registered as ``columns``. See :ref:`the User Manual
+<columnar-data>` for more information and examples.
+
+"""
+
+from __future__ import print_function, unicode_literals
+
+from array import array
+from collections import Mapping, Sequence
+import json
+import mmap
+import struct
+
+__all__ = ['ColumnarSerializer', 'Row', 'Rows']
+
+_MAGIC = b'AWC1'
+# Position and length of the footer (JSON description of the columns)
+_TRAILER = struct.Struct(b'<QI')
+# Offsets are unsigned 32-bit integers
+_OFFSET_TYPE = b'I' if array(b'I').itemsize == 4 else b'L'
+
+# Column kinds: all values are strings, or values are JSON-encoded
+_STRINGS = 's'
+_JSON = 'j'
+
+
+def _encode(name, value):
+    """Return ``value`` of column ``name`` as UTF-8.
+
+    Raises :class:`ValueError` if ``value`` is a non-UTF-8 ``str``.
+
+    """
+    if not isinstance(value, bytes):
+        return value.encode('utf-8')
+    try:
+        value.decode('utf-8')
+    except UnicodeDecodeError:
+        raise ValueError('Value of {0!r} is not UTF-8: {1!r}'.format(
+            name, value))
+    return value
+
+
+class Row(Mapping):
+    """One item of :class:`Rows`. Values are decoded when accessed.
+
+    Rows are read-only mappings that compare equal to a ``dict`` with
+    the same contents. They're pickled as a ``dict``.
+
+    """
+
+    __slots__ = ('_rows', '_index')
+
+    def __init__(self, rows, index):
+        """Create new :class:`Row`."""
+        self._rows = rows
+        self._index = index
+
+    def __getitem__(self, key):
+        """Return value of ``key``."""
+        rows = self._rows
+        try:
+            positions, is_json = rows._cells[key]
+        except KeyError:
+            positions, is_json = rows._load_column(key)
+
+        i = self._index
+        # unicode() is faster than str.decode()
+        value = unicode(rows._data[positions[i]:positions[i + 1]], 'utf-8')
+        if is_json:
+            return json.loads(value)
+        return value
+
+    def __iter__(self):
+        """Iterate over keys."""
+        return iter(self._rows.columns)
+
+    def __len__(self):
+        """Number of keys."""
+        return len(self._rows.columns)
+
+    def __reduce__(self):
+        """Pickle as a ``dict``."""
+        return (dict, (dict(self),))
+
+    def __repr__(self):
+        """Decode all values."""
+        return 'Row({0!r})'.format(dict(self))
+
+
+class Rows(Sequence):
+    """Read-only list of :class:`Row` objects in a memory-mapped file.
+
+    .. versionadded:: 1.41
+
+    Returned by :meth:`ColumnarSerializer.load`. A column's offsets are
+    read the first time one of its values is accessed, and values are
+    decoded on every access.
+
+    The same :class:`Row` object is returned each time an item is
+    accessed, so rows can be compared by identity.
+
+    Call :meth:`close` (or use :class:`Rows` as a context manager) to
+    unmap the file as soon as you're done with the rows. Otherwise,
+    it's unmapped when :class:`Rows` is garbage-collected. Rows can't
+    be accessed after the file is closed. Closed :class:`Rows` aren't
+    returned from :attr:`Workflow.memory_cache
+    <workflow.Workflow.memory_cache>`: the file is mapped again.
+
+    :param data: contents of the file
+    :type data: :class:`mmap.mmap` or ``str``
+
+    """
+
+    def __init__(self, data):
+        """Create new :class:`Rows`."""
+        if data[:len(_MAGIC)] != _MAGIC:
+            raise ValueError('Not a columnar data file')
+
+        self._data = data
+        pos, size = _TRAILER.unpack_from(data, len(data) - _TRAILER.size)
+        footer = json.loads(data[pos:pos + size].decode('utf-8'))
+        self._size = footer['rows']
+        #: Keys of the rows
+        self.columns = [c['name'] for c in footer['columns']]
+        self._columns = dict([(c['name'], c) for c in footer['columns']])
+        # Positions of values in data and whether they're JSON, keyed
+        # by column name. Loaded on demand.
+        self._cells = {}
+        # Row objects, created on demand
+        self._rows = [None] * self._size
+        #: Whether :meth:`close` has been called
+        self.closed = False
+
+    def __len__(self):
+        """Number of rows."""
+        return self._size
+
+    def __getitem__(self, index):
+        """Return :class:`Row` or list of rows."""
+        if isinstance(index, slice):
+            return [self[i] for i in xrange(*index.indices(self._size))]
+
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError('row index out of range')
+
+        row = self._rows[index]
+        if row is None:
+            row = self._rows[index] = Row(self, index)
+        return row
+
+    def __iter__(self):
+        """Iterate over rows."""
+        rows = self._rows
+        for i, row in enumerate(rows):
+            if row is None:
+                row = rows[i] = Row(self, i)
+            yield row
+
+    def column(self, name):
+        """Return all values of ``name``.
+
+        Faster than getting the value from each row.
+
+        :param name: key of rows
+        :type name: ``unicode``
+        :returns: list of decoded values
+        :rtype: ``list``
+
+        """
+        try:
+            positions, is_json = self._cells[name]
+        except KeyError:
+            positions, is_json = self._load_column(name)
+
+        data = self._data
+        values = [unicode(data[positions[i]:positions[i + 1]], 'utf-8')
+                  for i in xrange(self._size)]
+        if is_json:
+            return [json.loads(v) for v in values]
+        return values
+
+    def close(self):
+        """Unmap the file."""
+        if hasattr(self._data, 'close'):
+            self._data.close()
+        self.closed = True
+
+    def __enter__(self):
+        """Return self."""
+        return self
+
+    def __exit__(self, typ, value, traceback):
+        """Unmap the file."""
+        self.close()
+
+    def _load_column(self, name):
+        """Read offsets of column ``name``."""
+        column = self._columns[name]  # raises KeyError
+        start = column['offsets']
+        offsets = array(_OFFSET_TYPE)
+        offsets.fromstring(self._data[start:start + 4 * (self._size + 1)])
+        # Offsets are relative to start of column's values
+        heap = column['heap']
+        cells = self._cells[name] = ([heap + n for n in offsets],
+                                     column['kind'] == _JSON)
+        return cells
+
+
+class ColumnarSerializer(object):
+    """Save lists of dicts column by column and load them lazily.
+
+    .. versionadded:: 1.41
+
+    Every item of the list must be a ``dict`` with the same keys.
+    Columns whose values are all strings are stored as UTF-8. Values
+    of other columns must be JSON-serializable and are stored as
+    JSON. :class:`ValueError` is raised for other data.
+
+    Strings are always loaded as ``unicode``, so ``str`` values must
+    be UTF-8-encoded (:class:`ValueError` is raised if they aren't).
+
+    :meth:`load` memory-maps the file and returns a :class:`Rows`
+    sequence. As with any memory-mapped file, rows must not be
+    accessed after the file is truncated (replacing the file, as
+    :meth:`Workflow.cache_data() <workflow.Workflow.cache_data>` does,
+    is safe).
+
+    """
+
+    @classmethod
+    def load(cls, file_obj):
+        """Memory-map open file.
+
+        :param file_obj: file handle
+        :type file_obj: ``file`` object
+        :returns: lazy list of rows
+        :rtype: :class:`Rows`
+
+        """
+        try:
+            data = mmap.mmap(file_obj.fileno(), 0, access=mmap.ACCESS_READ)
+        except (AttributeError, IOError, ValueError):  # not a real file
+            data = file_obj.read()
+        return Rows(data)
+
+    @classmethod
+    def dump(cls, obj, file_obj):
+        """Write list of dicts ``obj`` to open file column by column.
+
+        :param obj: list of dicts with the same keys
+        :type obj: ``list``
+        :param file_obj: file handle
+        :type file_obj: ``file`` object
+
+        """
+        rows = list(obj)
+        names = sorted(rows[0]) if rows else []
+        for row in rows:
+            if not isinstance(row, Mapping) or len(row) != len(names):
+                raise ValueError('Items must be dicts with the same keys')
+
+        file_obj.write(_MAGIC)
+        pos = len(_MAGIC)
+        columns = []
+        for name in names:
+            try:
+                values = [row[name] for row in rows]
+            except KeyError:
+                raise ValueError('Items must be dicts with the same keys')
+
+            if all([isinstance(v, basestring) for v in values]):
+                kind = _STRINGS
+                cells = [_encode(name, v) for v in values]
+            else:
+                kind = _JSON
+                cells = [json.dumps(v, separators=(',', ':'))
+                         for v in values]
+
+            offsets = array(_OFFSET_TYPE, [0])
+            size = 0
+            for cell in cells:
+                size += len(cell)
+                offsets.append(size)
+            if size >= 2 ** 32:
+                raise ValueError('Column {0!r} is too large'.format(name))
+
+            file_obj.write(offsets.tostring())
+            file_obj.write(b''.join(cells))
+            columns.append({'name': name, 'kind': kind, 'offsets': pos,
+                            'heap': pos + 4 * len(offsets)})
+            pos += 4 * len(offsets) + size
+
+        footer = json.dumps({'rows': len(rows),
+                             'columns': columns}).encode('utf-8')
+        file_obj.write(footer)
+        file_obj.write(_TRAILER.pack(pos, len(footer)))
@@ -0,0 +1,225 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# Copyright (c) 2026 Dean Jackson <deanishe@deanishe.net>
+#
+# MIT Licence. See http://opensource.org/licenses/MIT
+#
+# Created on 2026-10-17
+#
+
+"""Rank frequently and recently used results higher.
+
+A :class:`Frecency` records which results the user actions, and
+turns the records into a bonus that :meth:`Workflow.filter()
+<workflow.Workflow.filter>` adds to the scores of those results.
+
+Each use counts for less as time passes: its weight halves every
+``half_life`` seconds. Uses are appended to a small log file, which
+is regularly compacted into a binary file of decayed counts, so
+reading the counts (on every keypress) is fast.
+
+See :ref:`the User Manual <frecency>` for more information and
+examples.
+
+"""
+
+from __future__ import print_function, unicode_literals
+
+from array import array
+import io
+import os
+import struct
+import time
+
+from .util import LockFile, atomic_writer
+
+__all__ = ['Frecency']
+
+#: Default half-life of uses in seconds (2 weeks)
+HALF_LIFE = 14 * 24 * 3600
+
+# Counts file header: magic, time counts are relative to, number of counts
+_HEADER = struct.Struct(b'<4sdI')
+_MAGIC = b'AWF1'
+
+# Counts smaller than this are dropped on compaction
+_MIN_COUNT = 0.01
+
+
+class Frecency(object):
+    """Decayed usage counts of results.
+
+    .. versionadded:: 1.41
+
+    Use :meth:`Workflow.frecency() <workflow.Workflow.frecency>` to
+    open the counts in your workflow's data directory.
+
+    Counts are saved in the binary file ``path``, and new uses are
+    appended to the log ``path + '.log'``. When the log grows larger
+    than ``compact_size`` bytes, it is merged into the counts.
+
+    :param path: path to counts file
+    :type path: ``unicode``
+    :param half_life: seconds after which a use counts half as much
+    :type half_life: ``float``
+    :param compact_size: size of log in bytes that triggers compaction
+    :type compact_size: ``int``
+
+    """
+
+    def __init__(self, path, half_life=HALF_LIFE, compact_size=4096):
+        """Create new :class:`Frecency`."""
+        self.path = path
+        self.logpath = path + '.log'
+        self.half_life = float(half_life)
+        self.compact_size = compact_size
+        self._cache = None
+
+    def add(self, uid, timestamp=None):
+        """Record a use of result ``uid``.
+
+        Call this when the user actions a result, e.g. in the Run
+        Script that handles a Script Filter's results.
+
+        :param uid: unique ID of the result
+        :type uid: ``unicode``
+        :param timestamp: time of use. Default is now.
+        :type timestamp: ``float``
+
+        """
+        if '\n' in uid or '\0' in uid:
+            raise ValueError('Invalid UID: {0!r}'.format(uid))
+
+        if timestamp is None:
+            timestamp = time.time()
+
+        with LockFile(self.path):
+            with io.open(self.logpath, 'a', encoding='utf-8') as fp:
+                fp.write('{0:.3f}\t{1}\n'.format(timestamp, uid))
+            if os.path.getsize(self.logpath) >= self.compact_size:
+                self._compact()
+        self._cache = None
+
+    def compact(self):
+        """Merge the log into the counts file."""
+        with LockFile(self.path):
+            self._compact()
+
+    def scores(self, now=None):
+        """Return current decayed counts of results.
+
+        :param now: time to calculate counts for. Default is now.
+        :type now: ``float``
+        :returns: ``{uid: count}``
+        :rtype: ``dict``
+
+        """
+        decay, counts = self._counts(now)
+        return dict([(uid, n * decay) for uid, n in counts.iteritems()])
+
+    def booster(self, uid=lambda x: x, weight=10.0):
+        """Return function for the ``boost`` argument of ``filter()``.
+
+        The bonus is ``weight * count / (count + 1)``, so it approaches
+        ``weight`` for results used a lot and recently.
+
+        :param uid: function to get unique ID from an item
+        :type uid: ``callable``
+        :param weight: maximum bonus
+        :type weight: ``float``
+        :returns: function that returns an item's bonus
+        :rtype: ``callable``
+
+        """
+        decay, counts = self._counts()
+
+        def boost(item):
+            """Return bonus for ``item``."""
+            n = counts.get(uid(item))
+            if not n:
+                return 0
+            n *= decay
+            return weight * n / (n + 1.0)
+
+        return boost
+
+    def _counts(self, now=None):
+        """Return counts and factor to decay them by.
+
+        Decaying the counts lazily saves a loop over all of them.
+
+        :param now: time to calculate counts for. Default is now.
+        :type now: ``float``
+        :returns: ``(decay, {uid: count})``
+        :rtype: ``tuple``
+
+        """
+        if now is None:
+            now = time.time()
+
+        if self._cache is None:
+            t0, counts = self._load()
+            for timestamp, uid in self._read_log():
+                counts[uid] = (counts.get(uid, 0) +
+                               2 ** ((timestamp - t0) / self.half_life))
+            self._cache = (t0, counts)
+
+        t0, counts = self._cache
+        return 2 ** ((t0 - now) / self.half_life), counts
+
+    def _load(self):
+        """Read counts file.
+
+        :returns: ``(time, counts)`` where ``counts`` is a dict of
+            counts relative to ``time``.
+        :rtype: ``tuple``
+
+        """
+        try:
+            with open(self.path, 'rb') as fp:
+                data = fp.read()
+        except IOError:  # no counts yet
+            return time.time(), {}
+
+        magic, t0, n = _HEADER.unpack_from(data)
+        if magic != _MAGIC:
+            raise ValueError('Invalid frecency file: ' + self.path)
+        start = _HEADER.size
+        counts = array(b'd')
+        counts.fromstring(data[start:start + 8 * n])
+        if not n:
+            return t0, {}
+        uids = data[start + 8 * n:].decode('utf-8').split('\0')
+        return t0, dict(zip(uids, counts))
+
+    def _read_log(self):
+        """Return list of ``(timestamp, uid)`` in log."""
+        try:
+            with io.open(self.logpath, encoding='utf-8') as fp:
+                data = fp.read()
+        except IOError:  # no log
+            return []
+
+        uses = []
+        for line in data.split('\n')[:-1]:  # last line may be incomplete
+            timestamp, uid = line.split('\t', 1)
+            uses.append((float(timestamp), uid))
+        return uses
+
+    def _compact(self):
+        """Merge log into counts file. Caller must hold lock."""
+        self._cache = None  # another process may have added uses
+        now = time.time()
+        scores = self.scores(now)
+        uids = [uid for uid in scores if scores[uid] >= _MIN_COUNT]
+        counts = array(b'd', [scores[uid] for uid in uids])
+
+        with atomic_writer(self.path, 'wb') as fp:
+            fp.write(_HEADER.pack(_MAGIC, now, len(uids)))
+            fp.write(counts.tostring())
+            fp.write('\0'.join(uids).encode('utf-8'))
+
+        if os.path.exists(self.logpath):
+            os.unlink(self.logpath)
+        self._cache = None
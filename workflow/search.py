@@ -0,0 +1,376 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# Copyright (c) 2026 Dean Jackson <deanishe@deanishe.net>
+#
+# MIT Licence. See http://opensource.org/licenses/MIT
+#
+# Created on 2026-10-17
+#
+
+"""Persistent search index backed by an SQLite full-text search table.
+
+:meth:`Workflow.filter() <workflow.Workflow.filter>` needs all the items
+in memory, so a workflow with a large dataset must load (e.g. unpickle)
+all of it on every keypress. A :class:`SearchIndex` keeps the items in
+an SQLite database on disk instead, and answers queries from an `FTS5`_
+index without loading the items that don't match.
+
+Items are added, updated and removed individually by a unique ID, so
+the index needn't be rebuilt when some of the items change.
+
+Results are ranked by SQL versions of the :meth:`~workflow.Workflow.filter`
+rules, but only items containing words that *start with* the words of the
+query are found: ``oba`` will not find "Foobar" and :const:`MATCH_ALLCHARS`
+isn't supported.
+
+See :ref:`the User Manual <search-index>` for more information and
+examples.
+
+.. _FTS5: https://www.sqlite.org/fts5.html
+
+"""
+
+from __future__ import print_function, unicode_literals
+
+import json
+import re
+import sqlite3
+
+from .workflow import (
+    MATCH_ALL,
+    MATCH_ATOM,
+    MATCH_CAPITALS,
+    MATCH_INITIALS_CONTAIN,
+    MATCH_INITIALS_STARTSWITH,
+    MATCH_STARTSWITH,
+    MATCH_SUBSTRING,
+    _search_key,
+    fold_to_ascii,
+    isascii,
+)
+
+__all__ = ['SearchIndex']
+
+# Schema version, stored in `PRAGMA user_version`
+SCHEMA_VERSION = 2
+
+# Columns holding the forms of the search keys. Columns without a
+# prefix hold the ASCII-folded key, columns prefixed with `u` the
+# unfolded key (used for non-ASCII queries).
+_KEY_COLUMNS = ('lower', 'capitals', 'atoms', 'initials',
+                'ulower', 'ucapitals', 'uatoms', 'uinitials')
+_FTS_COLUMNS = ('lower', 'initials', 'capitals',
+                'ulower', 'uinitials', 'ucapitals')
+
+_SCHEMA = """
+CREATE TABLE items (
+    id INTEGER PRIMARY KEY,
+    uid TEXT NOT NULL UNIQUE,
+    data TEXT,
+    key TEXT NOT NULL,
+    {columns}
+);
+
+CREATE VIRTUAL TABLE search USING fts5(
+    {fts},
+    content='items', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER items_ai AFTER INSERT ON items BEGIN
+    INSERT INTO search (rowid, {fts}) VALUES (new.id, {new});
+END;
+
+CREATE TRIGGER items_ad AFTER DELETE ON items BEGIN
+    INSERT INTO search (search, rowid, {fts})
+    VALUES ('delete', old.id, {old});
+END;
+
+CREATE TRIGGER items_au AFTER UPDATE ON items BEGIN
+    INSERT INTO search (search, rowid, {fts})
+    VALUES ('delete', old.id, {old});
+    INSERT INTO search (rowid, {fts}) VALUES (new.id, {new});
+END;
+""".format(
+    columns=',\n    '.join(['%s TEXT NOT NULL' % c for c in _KEY_COLUMNS]),
+    fts=', '.join(_FTS_COLUMNS),
+    new=', '.join(['new.' + c for c in _FTS_COLUMNS]),
+    old=', '.join(['old.' + c for c in _FTS_COLUMNS]))
+
+# Same tokens as FTS5's `unicode61` tokenizer
+_tokenize = re.compile(r'[^\W_]+', re.UNICODE).findall
+
+# SQL versions of the rules of `Workflow._score_key`, in the same order.
+# `{w}` is the parameter holding the query word, `{n}` its length and
+# `{u}` the prefix of the key columns to use. Like in Python 2, dividing
+# integers in SQLite rounds down.
+_RULES = (
+    (MATCH_STARTSWITH, 'instr(items.{u}lower, :{w}) = 1',
+     '100.0 - length(items.{u}lower) / {n}'),
+    (MATCH_CAPITALS, 'instr(items.{u}capitals, :{w}) = 1',
+     '100.0 - length(items.{u}capitals) / {n}'),
+    (MATCH_ATOM,
+     "instr(' ' || items.{u}atoms || ' ', ' ' || :{w} || ' ') > 0",
+     '100.0 - length(items.{u}lower) / {n}'),
+    (MATCH_INITIALS_STARTSWITH, 'instr(items.{u}initials, :{w}) = 1',
+     '100.0 - length(items.{u}initials) / {n}'),
+    (MATCH_INITIALS_CONTAIN, 'instr(items.{u}initials, :{w}) > 0',
+     '95.0 - length(items.{u}initials) / {n}'),
+    (MATCH_SUBSTRING, 'instr(items.{u}lower, :{w}) > 0',
+     '90.0 - length(items.{u}lower) / {n}'),
+)
+
+
+class SearchIndex(object):
+    """Items stored in an SQLite database with a full-text index.
+
+    .. versionadded:: 1.41
+
+    Items must be JSON-serialisable. Each has a unique ID and a search
+    key, which are ``unicode`` strings. As with :meth:`Workflow.filter()
+    <workflow.Workflow.filter>`, ASCII queries are matched against search
+    keys folded to ASCII (see :meth:`Workflow.fold_to_ascii()
+    <workflow.Workflow.fold_to_ascii>`), and other queries against the
+    unfolded keys.
+
+    Use :meth:`Workflow.search_index() <workflow.Workflow.search_index>`
+    to open an index in your workflow's data directory.
+
+    Requires a version of SQLite with FTS5, which is the case for the
+    Python that comes with macOS.
+
+    :param path: path to database file. Created if it doesn't exist.
+    :type path: ``unicode``
+
+    """
+
+    def __init__(self, path):
+        """Open (and create if necessary) database at ``path``."""
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        version = self.conn.execute('PRAGMA user_version').fetchone()[0]
+        if version != SCHEMA_VERSION:
+            with self.conn:
+                rows = []
+                if version:  # re-add items of older index
+                    rows = self.conn.execute(
+                        'SELECT uid, key, data FROM items ORDER BY id'
+                    ).fetchall()
+                    self.conn.executescript(
+                        'DROP TABLE search; DROP TABLE items;')
+                self.conn.executescript(_SCHEMA)
+                for uid, key, data in rows:
+                    self._add(uid, key, json.loads(data))
+                self.conn.execute('PRAGMA user_version = {0}'.format(
+                                  SCHEMA_VERSION))
+
+    def close(self):
+        """Close the database."""
+        self.conn.close()
+
+    def __enter__(self):
+        """Return index."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Close the database."""
+        self.close()
+
+    def __len__(self):
+        """Number of items in the index."""
+        return self.conn.execute('SELECT count(*) FROM items').fetchone()[0]
+
+    def __contains__(self, uid):
+        """Whether the index contains an item with ID ``uid``."""
+        row = self.conn.execute('SELECT 1 FROM items WHERE uid = ?',
+                                (uid,)).fetchone()
+        return row is not None
+
+    def get(self, uid, default=None):
+        """Return item with ID ``uid``.
+
+        :param uid: ID of item
+        :type uid: ``unicode``
+        :param default: value to return if there is no such item
+        :returns: item or ``default``
+
+        """
+        row = self.conn.execute('SELECT data FROM items WHERE uid = ?',
+                                (uid,)).fetchone()
+        if row is None:
+            return default
+        return json.loads(row[0])
+
+    def add(self, uid, key, item=None):
+        """Add item to index or replace item with the same ID.
+
+        :param uid: unique ID of item
+        :type uid: ``unicode``
+        :param key: search key of item
+        :type key: ``unicode``
+        :param item: item to store. If ``None``, ``key`` is the item.
+
+        """
+        with self.conn:
+            self._add(uid, key, item)
+
+    def update(self, items, key=lambda x: x, uid=None):
+        """Add or replace many items in one transaction.
+
+        :param items: iterable of items to add
+        :param key: function to get search key from ``items``
+        :type key: ``callable``
+        :param uid: function to get ID from ``items``. If ``None``,
+            the search key is the ID.
+        :type uid: ``callable``
+
+        """
+        uid = uid or key
+        with self.conn:
+            for item in items:
+                self._add(uid(item), key(item), item)
+
+    def delete(self, *uids):
+        """Remove items with IDs ``uids`` from the index.
+
+        IDs that aren't in the index are ignored.
+
+        :param uids: IDs of items to remove
+        :type uids: ``unicode``
+
+        """
+        with self.conn:
+            self.conn.executemany('DELETE FROM items WHERE uid = ?',
+                                  [(uid,) for uid in uids])
+
+    def clear(self):
+        """Remove all items from the index."""
+        with self.conn:
+            self.conn.execute('DELETE FROM items')
+
+    def search(self, query, max_results=50, include_score=False,
+               min_score=0, match_on=MATCH_ALL):
+        """Return items matching ``query``, best first.
+
+        If ``query`` is empty, all items are returned in the order they
+        were added.
+
+        :param query: query to search for
+        :type query: ``unicode``
+        :param max_results: If non-zero, return at most this many items.
+        :type max_results: ``int``
+        :param include_score: If ``True``, results will be a list of
+            tuples ``(item, score, rule)``.
+        :type include_score: ``Boolean``
+        :param min_score: If non-zero, ignore results with a score lower
+            than this.
+        :type min_score: ``int``
+        :param match_on: Bitwise-combined ``MATCH_*`` rules to use, as for
+            :meth:`Workflow.filter() <workflow.Workflow.filter>`.
+            :const:`MATCH_ALLCHARS` is ignored.
+        :type match_on: ``int``
+        :returns: list of items or ``(item, score, rule)`` tuples
+
+        """
+        words = query.lower().split()
+        # Like `filter`, match ASCII queries against folded keys
+        prefix = '' if isascii(query) else 'u'
+        limit = ' LIMIT {0:d}'.format(max_results) if max_results else ''
+
+        if not words:
+            sql = 'SELECT data FROM items ORDER BY id' + limit
+            return [json.loads(row[0]) for row in self.conn.execute(sql)]
+
+        rules = [r for r in _RULES if match_on & r[0]]
+        if not rules:
+            return []
+
+        params = {}
+        columns = []
+        phrases = []
+        for i, word in enumerate(words):
+            params['w%d' % i] = word
+            columns.append(self._score_sql(rules, 'w%d' % i, len(word),
+                                           prefix))
+            tokens = _tokenize(word)
+            if tokens:
+                # all tokens of the word, in order, the last one as a prefix
+                phrases.append(' + '.join(['"%s"' % t for t in tokens]) + '*')
+
+        # rule of the last word
+        rule = 'CASE {0} ELSE 0 END'.format(' '.join(
+            ['WHEN {0} THEN {1:d}'.format(
+                cond.format(w='w%d' % (len(words) - 1), u=prefix), flag)
+             for flag, cond, _ in rules]))
+
+        if phrases:
+            params['fts'] = '{{{0}lower {0}initials {0}capitals}} : ({1})'\
+                .format(prefix, ' AND '.join(phrases))
+            source = ('search JOIN items ON items.id = search.rowid '
+                      'WHERE search MATCH :fts')
+        else:  # e.g. query contains only punctuation
+            source = 'items'
+
+        scores = ', '.join(['{0} AS s{1:d}'.format(c, i)
+                            for i, c in enumerate(columns)])
+        inner = ('SELECT items.data, items.{0}lower AS lower, {1}, '
+                 '{2} AS rule FROM {3}'.format(prefix, scores, rule, source))
+        # Like `filter`, skip items that any word scores 0 for
+        where = ' AND '.join(['s%d != 0' % i for i in range(len(words))])
+        score = ' + '.join(['s%d' % i for i in range(len(words))])
+        sql = ('SELECT data, {0} AS score, rule FROM ({1}) WHERE {2}'
+               .format(score, inner, where))
+        if min_score:
+            params['min_score'] = min_score
+            sql += ' AND score > :min_score'
+        sql += ' ORDER BY score DESC, lower' + limit
+
+        results = []
+        for data, score, rule in self.conn.execute(sql, params):
+            if include_score:
+                results.append((json.loads(data), score, rule))
+            else:
+                results.append(json.loads(data))
+        return results
+
+    def _add(self, uid, key, item):
+        """Insert or update item in the current transaction."""
+        if item is None:
+            item = key
+        key = key.strip()
+        row = [json.dumps(item), key]
+        for value in (fold_to_ascii(key), key):
+            _, lower, _, capitals, atoms, initials = _search_key(value)
+            row.extend([lower, capitals, ' '.join(atoms), initials])
+        row.append(uid)
+
+        columns = ('data', 'key') + _KEY_COLUMNS
+        cursor = self.conn.execute(
+            'UPDATE items SET {0} WHERE uid = ?'.format(
+                ', '.join(['%s = ?' % c for c in columns])), row)
+        if not cursor.rowcount:
+            self.conn.execute(
+                'INSERT INTO items ({0}, uid) VALUES ({1})'.format(
+                    ', '.join(columns), ', '.join('?' * len(row))), row)
+
+    def _score_sql(self, rules, param, size, prefix):
+        """Return SQL expression of score of a query word.
+
+        :param rules: ``(flag, condition, score)`` of rules to use
+        :type rules: ``list``
+        :param param: name of SQL parameter holding word
+        :type param: ``unicode``
+        :param size: length of word
+        :type size: ``int``
+        :param prefix: prefix of key columns, ``''`` for folded keys or
+            ``'u'`` for unfolded ones
+        :type prefix: ``unicode``
+        :returns: SQL ``CASE`` expression
+        :rtype: ``unicode``
+
+        """
+        cases = ['WHEN {0} THEN {1}'.format(cond.format(w=param, u=prefix),
+                                            score.format(n=size, u=prefix))
+                 for _, cond, score in rules]
+        return 'CASE {0} ELSE 0 END'.format(' '.join(cases))
@@ -13,7 +13,7 @@
 from __future__ import print_function, absolute_import
 
 import atexit
-from collections import namedtuple
+from collections import namedtuple, OrderedDict
 from contextlib import contextmanager
 import errno
 import fcntl
@@ -545,6 +545,11 @@ class LockFile(object):
                 if err.errno not in (errno.EACCES, errno.EAGAIN):
                     raise
 
+                # The holder deletes the lockfile when it releases the
+                # lock, so open it again on the next attempt
+                self._lockfile.close()
+                self._lockfile = None
+
                 # Don't try again
                 if not blocking:  # pragma: no cover
                     return False
@@ -587,6 +592,132 @@ class LockFile(object):
         self.release()  # pragma: no cover
 
 
+class LRUCache(object):
+    """Mapping that holds at most ``maxsize`` items.
+
+    .. versionadded:: 1.41
+
+    When the cache is full, adding an item discards the least recently
+    used one. Lookups via :meth:`get` are counted in :attr:`hits` and
+    :attr:`misses`.
+
+    If ``maxbytes`` is set, items added with :meth:`set` and their
+    approximate size are also discarded until the sizes of all items
+    add up to at most ``maxbytes``. Items larger than ``maxbytes`` are
+    not cached at all.
+
+    >>> cache = LRUCache(2)
+    >>> cache['a'] = 1
+    >>> cache['b'] = 2
+    >>> cache.get('a')
+    1
+    >>> cache['c'] = 3  # discards 'b'
+    >>> cache.get('b') is None
+    True
+
+    Args:
+        maxsize (int, optional): Maximum number of items.
+        maxbytes (int, optional): Maximum total size of items.
+
+    Attributes:
+        hits (int): Number of :meth:`get` calls that found the key.
+        maxbytes (int): Maximum total size of items or ``None``.
+        maxsize (int): Maximum number of items.
+        misses (int): Number of :meth:`get` calls that didn't.
+        size (int): Total size of items.
+
+    """
+
+    def __init__(self, maxsize=1024, maxbytes=None):
+        """Create new :class:`LRUCache`."""
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        # Sizes of items added with `set()`
+        self._sizes = {}
+
+    def get(self, key, default=None):
+        """Return value for ``key`` or ``default`` if it isn't cached.
+
+        Args:
+            key (hashable): Key to retrieve.
+            default (object, optional): Value to return if ``key``
+                isn't cached.
+
+        Returns:
+            object: Cached value or ``default``.
+
+        """
+        try:
+            value = self._data.pop(key)
+        except KeyError:
+            self.misses += 1
+            return default
+
+        # move to most-recently used end
+        self._data[key] = value
+        self.hits += 1
+        return value
+
+    def __setitem__(self, key, value):
+        """Cache ``value`` under ``key``."""
+        self.set(key, value)
+
+    def set(self, key, value, size=0):
+        """Cache ``value`` of approximately ``size`` bytes under ``key``.
+
+        Args:
+            key (hashable): Key to cache ``value`` under.
+            value (object): Value to cache.
+            size (int, optional): Approximate size of ``value``.
+
+        """
+        self.pop(key)
+        if self.maxbytes is not None and size > self.maxbytes:
+            return
+
+        self._data[key] = value
+        if size:
+            self._sizes[key] = size
+            self.size += size
+
+        while len(self._data) > self.maxsize or (
+                self.maxbytes is not None and self.size > self.maxbytes):
+            self.pop(next(iter(self._data)))
+
+    def pop(self, key, default=None):
+        """Remove ``key`` and return its value.
+
+        Args:
+            key (hashable): Key to remove.
+            default (object, optional): Value to return if ``key``
+                isn't cached.
+
+        Returns:
+            object: Cached value or ``default``.
+
+        """
+        self.size -= self._sizes.pop(key, 0)
+        return self._data.pop(key, default)
+
+    def __contains__(self, key):
+        """Whether ``key`` is cached. Doesn't count as a use."""
+        return key in self._data
+
+    def __len__(self):
+        """Number of cached items."""
+        return len(self._data)
+
+    def clear(self):
+        """Empty cache and reset :attr:`hits` and :attr:`misses`."""
+        self._data.clear()
+        self._sizes.clear()
+        self.size = self.hits = self.misses = 0
+
+
 class uninterruptible(object):
     """Decorator that postpones SIGTERM until wrapped function returns.
 
@@ -0,0 +1,292 @@
+#!/usr/bin/env python
+# encoding: utf-8
+#
+# Copyright (c) 2026 Dean Jackson <deanishe@deanishe.net>
+#
+# MIT Licence. See http://opensource.org/licenses/MIT
+#
+# Created on 2026-10-17
+#
+
+"""NumPy implementation of :meth:`~workflow.Workflow.filter`.
+
+Used by :class:`~workflow.FilterIndex` objects created with
+``use_numpy=True``. Importing this module raises :class:`ImportError`
+if NumPy isn't installed.
+
+The search keys of an index are encoded as padded matrices of
+codepoints, and the cheap rules (startswith, capitals, initials and
+substring) are evaluated for all items at once. Atoms, typos and
+"all characters" are checked in Python, but only for the items that
+the other rules didn't match.
+
+"""
+
+from __future__ import print_function, absolute_import, unicode_literals
+
+import sys
+
+import numpy as np
+
+from .workflow import (
+    MATCH_ALLCHARS,
+    MATCH_ATOM,
+    MATCH_CAPITALS,
+    MATCH_FUZZY_TYPO,
+    MATCH_INITIALS_CONTAIN,
+    MATCH_INITIALS_STARTSWITH,
+    MATCH_STARTSWITH,
+    MATCH_SUBSTRING,
+)
+
+# Search keys longer than this are scored in Python
+MAX_WIDTH = 128
+
+# Encode strings as UTF-16 on narrow builds of Python, so that an
+# array element is equivalent to a character of a `unicode` string
+if sys.maxunicode > 0xffff:
+    _ENCODING, _DTYPE = 'utf-32-le', np.uint32
+else:  # pragma: no cover
+    _ENCODING, _DTYPE = 'utf-16-le', np.uint16
+
+_MASK64 = (1 << 64) - 1
+
+
+def _encode(text):
+    """Return array of the characters in ``text``."""
+    return np.frombuffer(text.encode(_ENCODING), dtype=_DTYPE)
+
+
+def _matrix(strings, width):
+    """Return ``strings`` as a matrix of characters padded with zeros.
+
+    Args:
+        strings (list): ``unicode`` strings of at most ``width`` characters.
+        width (int): Number of columns.
+
+    Returns:
+        numpy.ndarray: ``len(strings)`` x ``width`` array.
+
+    """
+    buf = ''.join([s.ljust(width, '\0') for s in strings])
+    return _encode(buf).reshape((len(strings), width))
+
+
+def _startswith(chars, lengths, query):
+    """Return which rows of ``chars`` start with ``query``."""
+    if len(query) > chars.shape[1]:
+        return np.zeros(len(chars), dtype=bool)
+
+    return ((lengths >= len(query)) &
+            (chars[:, :len(query)] == query).all(axis=1))
+
+
+def _contains(chars, lengths, query):
+    """Return which rows of ``chars`` contain ``query``."""
+    n = len(query)
+    hits = np.zeros(len(chars), dtype=bool)
+    # padding can't match, as queries contain no null characters
+    for i in range(chars.shape[1] - n + 1):
+        found = chars[:, i] == query[0]
+        for j in range(1, n):
+            found &= chars[:, i + j] == query[j]
+        hits |= found
+
+    return hits & (lengths >= n)
+
+
+class KeyArrays(object):
+    """Search keys as arrays.
+
+    Args:
+        skeys (list): Search keys as returned by
+            :func:`workflow.workflow._search_key` (``None`` for empty keys).
+
+    Attributes:
+        python (numpy.ndarray): Indices of keys that must be scored
+            in Python because they are too long to fit in the matrices.
+        valid (numpy.ndarray): Which keys are in the matrices.
+
+    """
+
+    def __init__(self, skeys):
+        """Create new :class:`KeyArrays`."""
+        n = len(skeys)
+        empty = ('', '', 0, '', (), '')
+        skeys = [k if k is not None else empty for k in skeys]
+
+        self.valid = np.array([k[0] != '' and len(k[0]) <= MAX_WIDTH
+                               for k in skeys], dtype=bool)
+        self.python = np.flatnonzero(
+            np.array([len(k[0]) > MAX_WIDTH for k in skeys], dtype=bool))
+        skeys = [k if len(k[0]) <= MAX_WIDTH else empty for k in skeys]
+
+        width = max([len(k[0]) for k in skeys] + [1])
+        self.lengths = np.array([len(k[0]) for k in skeys], dtype=np.int64)
+        self.lower = _matrix([k[1] for k in skeys], width)
+        self.caplengths = np.array([len(k[3]) for k in skeys],
+                                   dtype=np.int64)
+        self.capitals = _matrix([k[3] for k in skeys], width)
+        self.initlengths = np.array([len(k[5]) for k in skeys],
+                                    dtype=np.int64)
+        self.initials = _matrix([k[5] for k in skeys], width)
+
+        # `_char_mask` uses 192 bits
+        self.masks = np.array([(k[2] & _MASK64, (k[2] >> 64) & _MASK64,
+                                k[2] >> 128) for k in skeys],
+                              dtype=np.uint64).reshape((n, 3))
+
+
+def _score_word(arrays, keys, word, match_on, score_key):
+    """Score every item against a single word of a query.
+
+    Args:
+        arrays (KeyArrays): Search keys to score.
+        keys (list): Search keys of :class:`~workflow.FilterIndex`.
+        word (_QueryWord): Compiled query word.
+        match_on (int): ``MATCH_*`` flags.
+        score_key (callable): :meth:`Workflow._score_key`.
+
+    Returns:
+        tuple: ``(scores, rules)`` arrays. Rule is ``0`` if no rule
+            matched.
+
+    """
+    scores = np.zeros(len(keys), dtype=np.float64)
+    rules = np.zeros(len(keys), dtype=np.int64)
+
+    # keys that don't fit in the arrays
+    fold = word.fold
+    for i in arrays.python.tolist():
+        s, rule = score_key(keys[i][fold], word, match_on)
+        if rule:
+            scores[i] = s
+            rules[i] = rule
+
+    # pre-filter items that don't contain all characters of `word`
+    ok = arrays.valid.copy()
+    for j in range(3):
+        m = (word.mask >> (64 * j)) & _MASK64
+        if m:
+            m = np.uint64(m)
+            ok &= (arrays.masks[:, j] & m) == m
+
+    def typo(i):
+        """Score key ``i`` with MATCH_FUZZY_TYPO."""
+        s, rule = score_key(keys[i][fold], word, MATCH_FUZZY_TYPO)
+        if rule:
+            scores[i] = s
+            rules[i] = rule
+        return bool(rule)
+
+    typos = match_on & MATCH_FUZZY_TYPO and word.typos
+    if typos:
+        # typos needn't contain all the characters of `word`
+        for i in np.flatnonzero(arrays.valid & ~ok).tolist():
+            typo(i)
+
+    rows = np.flatnonzero(ok)
+    if not len(rows):
+        return scores, rules
+
+    query = _encode(word.text)
+    n = len(query)
+    todo = np.ones(len(rows), dtype=bool)
+
+    def assign(hits, s, rule):
+        """Set score and rule of unscored ``hits``."""
+        hits = hits & todo
+        scores[rows[hits]] = s[hits]
+        rules[rows[hits]] = rule
+        todo[hits] = False
+
+    # Same order and formulae as `Workflow._score_key`
+    lengths = arrays.lengths[rows]
+    lower = arrays.lower[rows]
+    if match_on & MATCH_STARTSWITH:
+        assign(_startswith(lower, lengths, query),
+               100.0 - lengths // n, MATCH_STARTSWITH)
+
+    if match_on & MATCH_CAPITALS:
+        caplengths = arrays.caplengths[rows]
+        assign(_startswith(arrays.capitals[rows], caplengths, query),
+               100.0 - caplengths // n, MATCH_CAPITALS)
+
+    contains = None
+    if match_on & (MATCH_ATOM | MATCH_SUBSTRING):
+        contains = _contains(lower, lengths, query)
+
+    if match_on & MATCH_ATOM:
+        # atoms are substrings, so only check those in Python
+        hits = np.zeros(len(rows), dtype=bool)
+        for k in np.flatnonzero(contains & todo).tolist():
+            hits[k] = word.text in keys[rows[k]][fold][4]
+        assign(hits, 100.0 - lengths // n, MATCH_ATOM)
+
+    if match_on & (MATCH_INITIALS_STARTSWITH | MATCH_INITIALS_CONTAIN):
+        initlengths = arrays.initlengths[rows]
+        initials = arrays.initials[rows]
+        if match_on & MATCH_INITIALS_STARTSWITH:
+            assign(_startswith(initials, initlengths, query),
+                   100.0 - initlengths // n, MATCH_INITIALS_STARTSWITH)
+        if match_on & MATCH_INITIALS_CONTAIN:
+            assign(_contains(initials, initlengths, query),
+                   95.0 - initlengths // n, MATCH_INITIALS_CONTAIN)
+
+    if match_on & MATCH_SUBSTRING:
+        assign(contains, 90.0 - lengths // n, MATCH_SUBSTRING)
+
+    if typos:
+        for k in np.flatnonzero(todo).tolist():
+            if typo(rows[k]):
+                todo[k] = False
+
+    if match_on & MATCH_ALLCHARS:
+        for k in np.flatnonzero(todo).tolist():
+            i = rows[k]
+            s, rule = score_key(keys[i][fold], word, MATCH_ALLCHARS)
+            if rule:
+                scores[i] = s
+                rules[i] = rule
+
+    return scores, rules
+
+
+def filter_arrays(words, items, keys, arrays, match_on, score_key):
+    """Filter the items of a :class:`~workflow.FilterIndex`.
+
+    Args:
+        words (list): Query compiled by :meth:`Workflow._compile_query`.
+        items (list): Indexed items.
+        keys (list): Search keys of index.
+        arrays (tuple): :class:`KeyArrays` of unfolded and folded keys.
+        match_on (int): ``MATCH_*`` flags.
+        score_key (callable): :meth:`Workflow._score_key`.
+
+    Returns:
+        tuple: ``(results, matched)``, where ``results`` is an unsorted
+            list of ``(sort key, (item, score, rule))`` and ``matched``
+            a list of the indices of items matched by a rule for every
+            word of ``query``.
+
+    """
+    total = np.zeros(len(items), dtype=np.float64)
+    matched = np.ones(len(items), dtype=bool)
+    skip = np.zeros(len(items), dtype=bool)
+    rules = None
+    for word in words:
+        scores, rules = _score_word(arrays[word.fold], keys, word,
+                                    match_on, score_key)
+        matched &= rules != 0
+        skip |= scores == 0
+        # summed in the same order as in Python
+        total += scores
+
+    hits = np.flatnonzero(matched & ~skip & (total != 0))
+    results = []
+    for i, score, rule in zip(hits.tolist(), total[hits].tolist(),
+                              rules[hits].tolist()):
+        results.append(((100.0 / score, keys[i][0][1], score),
+                        (items[i], score, rule)))
+
+    return results, np.flatnonzero(matched).tolist()
@@ -22,11 +22,18 @@ up your Python script to best utilise the :class:`Workflow` object.
 from __future__ import print_function, unicode_literals
 
 import binascii
+from collections import namedtuple
 import cPickle
 from copy import deepcopy
+from cStringIO import StringIO
+import functools
+import hashlib
+import heapq
+import itertools
 import json
 import logging
 import logging.handlers
+import multiprocessing
 import os
 import pickle
 import plistlib
@@ -37,17 +44,20 @@ import subprocess
 import sys
 import time
 import unicodedata
+import zlib
 
 try:
     import xml.etree.cElementTree as ET
 except ImportError:  # pragma: no cover
     import xml.etree.ElementTree as ET
 
+from columnar import ColumnarSerializer
 # imported to maintain API
 from util import AcquisitionError  # noqa: F401
 from util import (
     atomic_writer,
     LockFile,
+    LRUCache,
     uninterruptible,
 )
 
@@ -55,6 +65,11 @@ from util import (
 #: correctly have the value ``None``)
 UNSET = object()
 
+# :class:`~workflow.util.LRUCache` of data loaded by
+# :meth:`Workflow.cached_data` and :meth:`Workflow.stored_data`. Shared by
+# all :class:`Workflow` objects in the process.
+_memory_cache = None
+
 ####################################################################
 # Standard system icons
 ####################################################################
@@ -403,6 +418,10 @@ DUMB_PUNCTUATION = {
     '—': '-'
 }
 
+# `unicode.translate` tables built from the above mappings
+_ASCII_TABLE = dict([(ord(k), v) for k, v in ASCII_REPLACEMENTS.items()])
+_PUNCTUATION_TABLE = dict([(ord(k), v) for k, v in DUMB_PUNCTUATION.items()])
+
 
 ####################################################################
 # Used by `Workflow.filter`
@@ -415,6 +434,14 @@ INITIALS = string.ascii_uppercase + string.digits
 #: Split on non-letters, numbers
 split_on_delimiters = re.compile('[^a-zA-Z0-9]').split
 
+# Runs of letters and digits in any script ("words" of a search key)
+_find_words = re.compile(r'[^\W_]+', re.UNICODE).findall
+# Capital inside a word (OmniFocus, HTML) or non-ASCII character, i.e.
+# value might contain CamelCase words
+_find_camel = re.compile('[a-zA-Z][A-Z]|[^\x00-\x7f]').search
+# ASCII capitals and digits
+_find_capitals = re.compile('[A-Z0-9]+').findall
+
 # Match filter flags
 #: Match items that start with ``query``
 MATCH_STARTSWITH = 1
@@ -435,6 +462,17 @@ MATCH_SUBSTRING = 32
 MATCH_ALLCHARS = 64
 #: Combination of all other ``MATCH_*`` constants
 MATCH_ALL = 127
+#: Match items with a "word" that is ``query`` with a typo or two.
+#: Not included in :const:`MATCH_ALL`
+MATCH_FUZZY_TYPO = 128
+
+# Rules that only match items containing ``query``
+_SUBSTRING_RULES = MATCH_STARTSWITH | MATCH_ATOM | MATCH_SUBSTRING
+
+# Shortest query word matched by MATCH_FUZZY_TYPO
+_TYPO_MIN_LENGTH = 4
+# Shortest query word that may contain two typos
+_TYPO_LONG = 8
 
 
 ####################################################################
@@ -499,6 +537,897 @@ def isascii(text):
     return True
 
 
+def fold_to_ascii(text):
+    """Convert non-ASCII characters to closest ASCII equivalent.
+
+    .. versionadded:: 1.41
+
+    Module-level version of :meth:`Workflow.fold_to_ascii`.
+
+    :param text: text to convert
+    :type text: ``unicode``
+    :returns: text containing only ASCII characters
+    :rtype: ``unicode``
+
+    """
+    if isascii(text):
+        return text
+    text = text.translate(_ASCII_TABLE)
+    return unicode(unicodedata.normalize('NFKD',
+                   text).encode('ascii', 'ignore'))
+
+
+####################################################################
+# Search keys for `Workflow.filter`
+####################################################################
+
+def _char_mask(text):
+    """Return bitmask of the characters in ``text``.
+
+    ASCII characters have their own bit. Other characters share 64 bits
+    based on their codepoint, so the mask of a non-ASCII string may
+    claim characters it doesn't contain.
+
+    :param text: text to generate mask for
+    :type text: ``unicode``
+    :returns: bitmask
+    :rtype: ``int``
+
+    """
+    mask = 0
+    for c in set(text):
+        n = ord(c)
+        if n > 127:
+            n = 128 + n % 64
+        mask |= 1 << n
+    return mask
+
+
+#: Word of a query pre-processed by :meth:`Workflow._compile_query`:
+#: lowercase word, index of search key to match it against (1 for the
+#: ASCII-folded key), set and bitmask of its characters, and
+#: MATCH_ALLCHARS matcher and MATCH_FUZZY_TYPO matcher (if any)
+_QueryWord = namedtuple('_QueryWord', 'text fold chars mask search typos')
+
+
+def _search_key(value):
+    """Pre-compute the forms of ``value`` used by :meth:`Workflow.filter`.
+
+    :param value: search key of an item
+    :type value: ``unicode``
+    :returns: tuple of ``(value, lowercase value, bitmask of lowercase
+        characters, capitals, atoms, initials of atoms)``
+    :rtype: ``tuple``
+
+    """
+    lower = value.lower()
+    atoms, initials = _atoms(value, lower)
+    return (value, lower, _char_mask(lower), _capitals(value), atoms,
+            initials)
+
+
+def _atoms(value, lower):
+    """Split ``value`` into lowercase "atoms" and their initials.
+
+    Atoms are words separated by spaces or other non-word characters.
+    Words in CamelCase are also split into their parts, so "OmniFocus"
+    gives the atoms ``omnifocus``, ``omni`` and ``focus`` and the
+    initials ``of``.
+
+    :param value: search key of an item
+    :type value: ``unicode``
+    :param lower: lowercase ``value``
+    :type lower: ``unicode``
+    :returns: ``(atoms, initials)``
+    :rtype: ``tuple``
+
+    """
+    if not _find_camel(value):
+        atoms = _find_words(lower)
+        return tuple(atoms), ''.join([s[0] for s in atoms])
+
+    atoms = []
+    initials = ''
+    for word in _find_words(value):
+        low = word.lower()
+        atoms.append(low)
+        # Only words with capitals after their first letter can be
+        # CamelCase, i.e. not "word", "Word" or "WORD"
+        if word[1:] == low[1:] or word.isupper():
+            initials += low[0]
+            continue
+
+        start = 0
+        for i in xrange(1, len(word)):
+            # Boundary before a capital that follows a lowercase letter
+            # or digit (OmniFocus, MP3Player) or starts a word after an
+            # acronym (HTMLParser)
+            if word[i].isupper() and (not word[i - 1].isupper() or (
+                    i + 1 < len(word) and word[i + 1].islower())):
+                atoms.append(low[start:i])
+                initials += low[start]
+                start = i
+
+        if start:
+            atoms.append(low[start:])
+        initials += low[start]
+
+    # Remove repeated atoms (e.g. "FooFoo"), keeping the first
+    seen = set()
+    atoms = [a for a in atoms if not (a in seen or seen.add(a))]
+    return tuple(atoms), initials
+
+
+def _capitals(value):
+    """Return the capital letters and digits in ``value``.
+
+    :param value: search key of an item
+    :type value: ``unicode``
+    :returns: lowercase capitals and digits, e.g. ``of2`` for
+        "OmniFocus 2"
+    :rtype: ``unicode``
+
+    """
+    if isascii(value):
+        return ''.join(_find_capitals(value)).lower()
+    return ''.join([c for c in value if c.isupper() or c.isdigit()]).lower()
+
+
+def _match_allchars(query, value, lower):
+    """Find the characters of ``query`` in order in ``value``.
+
+    Equivalent to searching ``value`` with the regex
+    ``.*?q.*?u.*?e.*?r.*?y`` (case-insensitive for ASCII characters),
+    but takes linear time instead of backtracking: each character of
+    ``query`` is matched at its first occurrence after the previous
+    one. As ``.`` doesn't match a newline, the characters must all be
+    on the same line of ``value``.
+
+    :param query: lowercase query containing no newlines
+    :type query: ``unicode``
+    :param value: text to search
+    :type value: ``unicode``
+    :param lower: ``value.lower()``
+    :type lower: ``unicode``
+    :returns: ``(start, end)`` of match or ``None``
+    :rtype: ``tuple``
+
+    """
+    if '\n' not in lower:  # fast path for single-line values
+        pos = 0
+        for c in query:
+            i = lower.find(c, pos)
+            # Only ASCII characters are matched case-insensitively
+            while i != -1 and value[i] != c and value[i] > '\x7f':
+                i = lower.find(c, i + 1)
+            if i == -1:
+                return None
+            pos = i + 1
+        return (0, pos)
+
+    begin = 0
+    while True:
+        stop = lower.find('\n', begin)
+        if stop == -1:
+            stop = len(lower)
+
+        pos = begin
+        for c in query:
+            i = lower.find(c, pos, stop)
+            # Only ASCII characters are matched case-insensitively
+            while i != -1 and value[i] != c and value[i] > '\x7f':
+                i = lower.find(c, i + 1, stop)
+            if i == -1:
+                break
+            pos = i + 1
+        else:
+            return (begin, pos)
+
+        if stop == len(lower):
+            return None
+
+        begin = stop + 1
+
+
+# MATCH_ALLCHARS matchers of recent query words, shared by all
+# :class:`Workflow` instances
+_search_patterns = LRUCache(512)
+
+
+def _search_for_query(query):
+    """Return MATCH_ALLCHARS matcher for ``query``.
+
+    The matcher is called with ``(value, value.lower())`` and
+    returns ``(start, end)`` of the match or ``None``.
+
+    :param query: lowercase query word
+    :type query: ``unicode``
+    :returns: matcher function
+    :rtype: ``callable``
+
+    """
+    search = _search_patterns.get(query)
+    if search is not None:
+        return search
+
+    if '\n' not in query:
+        search = functools.partial(_match_allchars, query)
+
+    else:  # `_match_allchars` can't match newlines; use a regex
+        # Build pattern: include all characters
+        pattern = []
+        for c in query:
+            pattern.append('.*?{0}'.format(re.escape(c)))
+        pattern = ''.join(pattern)
+        regex = re.compile(pattern, re.IGNORECASE)
+
+        def search(value, lower):
+            match = regex.search(value)
+            return match.span() if match else None
+
+    _search_patterns[query] = search
+    return search
+
+
+def _query_narrows(previous, query, match_on):
+    """Whether only items matching ``previous`` can match ``query``.
+
+    True if ``query`` extends ``previous`` (e.g. ``goo`` -> ``goog``)
+    and the rules in ``match_on`` can't match an item against the
+    extended query that they didn't match against the shorter one.
+
+    :param previous: previous query
+    :type previous: ``unicode``
+    :param query: new query
+    :type query: ``unicode``
+    :param match_on: ``MATCH_*`` flags
+    :type match_on: ``int``
+    :rtype: ``bool``
+
+    """
+    # Only rule that isn't "prefix-safe": ``goog`` may be an atom
+    # when ``goo`` isn't. ``goo`` would still match as a substring.
+    if match_on & MATCH_ATOM and not match_on & MATCH_SUBSTRING:
+        return False
+    # ``firefix`` is a typo of "Firefox", but ``firefixe`` isn't
+    if match_on & MATCH_FUZZY_TYPO:
+        return False
+
+    old = [s.strip().lower() for s in previous.split(' ') if s.strip()]
+    new = [s.strip().lower() for s in query.split(' ') if s.strip()]
+    if not old or len(new) < len(old):
+        return False
+
+    for w1, w2 in zip(old, new):
+        # Diacritic folding depends on whether a word is ASCII
+        if not w2.startswith(w1) or isascii(w1) != isascii(w2):
+            return False
+
+    return True
+
+
+def _trigrams(text):
+    """Return set of the three-character substrings of ``text``."""
+    return set([text[i:i + 3] for i in range(len(text) - 2)])
+
+
+####################################################################
+# Typo matching for `MATCH_FUZZY_TYPO`
+####################################################################
+
+def _max_typos(size):
+    """Return number of typos allowed in a query word of length ``size``."""
+    return 1 if size < _TYPO_LONG else 2
+
+
+def _deletes(text, depth):
+    """Return set of ``text`` with up to ``depth`` characters deleted."""
+    found = set([text])
+    edge = found
+    for _ in range(depth):
+        edge = set([s[:i] + s[i + 1:] for s in edge for i in range(len(s))])
+        found |= edge
+    return found
+
+
+def _edit_distance(a, b, limit):
+    """Damerau-Levenshtein distance between ``a`` and ``b``.
+
+    This is the "optimal string alignment" distance, which counts
+    insertions, deletions, substitutions and transpositions of
+    adjacent characters.
+
+    :param a: first string
+    :type a: ``unicode``
+    :param b: second string
+    :type b: ``unicode``
+    :param limit: maximum distance of interest
+    :type limit: ``int``
+    :returns: distance or ``None`` if it's greater than ``limit``
+    :rtype: ``int``
+
+    """
+    if abs(len(a) - len(b)) > limit:
+        return None
+
+    before = None
+    previous = range(len(b) + 1)
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            d = min(previous[j] + 1, current[j - 1] + 1,
+                    previous[j - 1] + (a[i - 1] != b[j - 1]))
+            if (i > 1 and j > 1 and a[i - 1] == b[j - 2] and
+                    a[i - 2] == b[j - 1]):
+                d = min(d, before[j - 2] + 1)
+            current[j] = d
+
+        if min(current) > limit:
+            return None
+        before, previous = previous, current
+
+    if previous[-1] > limit:
+        return None
+    return previous[-1]
+
+
+class _TypoMatcher(object):
+    """Find atoms that are a query word with typos.
+
+    Candidates are found like `SymSpell
+    <https://github.com/wolfgarbe/SymSpell>`_ does: an atom within edit
+    distance *n* of the word can be turned into the same string as the
+    word by deleting at most *n* characters from each. Only candidates
+    have their edit distance calculated.
+
+    :param word: lowercase query word
+    :type word: ``unicode``
+    :param deletes: :attr:`FilterIndex._deletes` (maps deletions to the
+        space-separated atoms they come from) or ``None`` to check each
+        atom as it is seen.
+    :type deletes: ``dict``
+
+    Attributes:
+        distance (callable): Return edit distance of an atom or ``None``
+            if it's no typo of the word.
+
+    """
+
+    def __init__(self, word, deletes=None):
+        """Create new :class:`_TypoMatcher`."""
+        self.word = word
+        self.limit = _max_typos(len(word))
+        self._deletes = _deletes(word, self.limit)
+        # Cache of edit distances
+        self._found = {}
+        # Whether `_found` contains all atoms that are typos
+        self._complete = deletes is not None
+        if self._complete:
+            seen = set()
+            for s in self._deletes:
+                for atom in deletes.get(s, '').split():
+                    if atom not in seen:
+                        seen.add(atom)
+                        d = self._distance(atom)
+                        if d:
+                            self._found[atom] = d
+            self.distance = self._found.get
+        else:
+            self.distance = self._lookup
+
+    @property
+    def empty(self):
+        """Whether it's known that no atoms are typos of the word."""
+        return self._complete and not self._found
+
+    def _lookup(self, atom):
+        """Implement :meth:`distance` without an index."""
+        try:
+            return self._found[atom]
+        except KeyError:
+            pass
+
+        d = None
+        if (abs(len(atom) - len(self.word)) <= self.limit and
+                not self._deletes.isdisjoint(_deletes(atom, self.limit))):
+            d = self._distance(atom)
+        self._found[atom] = d
+        return d
+
+    def _distance(self, atom):
+        """Return edit distance or ``None`` if it's too large or 0."""
+        return _edit_distance(self.word, atom, self.limit) or None
+
+
+# Version of the search keys in a :class:`FilterIndex`. Cached indices
+# of older versions are rebuilt by :meth:`Workflow.filter_index`.
+_INDEX_FORMAT = 4
+
+
+class FilterIndex(object):
+    """Pre-processed items for :meth:`Workflow.filter`.
+
+    .. versionadded:: 1.41
+
+    :meth:`Workflow.filter` has to call ``key`` on every item, fold
+    the result to ASCII, and split it into atoms and initials every
+    time it is called. With large datasets, this preprocessing
+    dominates the time taken to filter items.
+
+    A :class:`FilterIndex` does this work once, and can be passed to
+    :meth:`Workflow.filter` in place of the list of items. It can
+    be pickled, so you can save it in your workflow's cache with
+    :meth:`Workflow.cache_data` or :meth:`Workflow.cached_data`:
+
+    >>> def build_index():
+    >>>     return FilterIndex(load_items(), key=lambda d: d['title'])
+    >>> index = wf.cached_data('index', build_index, max_age=3600)
+    >>> results = wf.filter(query, index)
+
+    If ``use_numpy`` is ``True`` and `NumPy <https://numpy.org/>`_ is
+    installed, the search keys are also stored as NumPy arrays, and
+    :meth:`Workflow.filter` scores all items at once instead of one by
+    one. This is considerably faster for large indices, but uses more
+    memory and takes longer to build. The results are the same. If
+    NumPy isn't installed, ``use_numpy`` is ignored.
+
+    If ``trigrams`` is ``True``, the index also maps every three-letter
+    sequence in the (lowercase) search keys to the items containing it.
+    When ``match_on`` only contains :const:`MATCH_STARTSWITH`,
+    :const:`MATCH_ATOM` and :const:`MATCH_SUBSTRING`, the rules that
+    require ``query`` to be a substring of the search key,
+    :meth:`Workflow.filter` only tests the items that contain every
+    trigram in the query.
+
+    If ``typos`` is ``True``, the index also maps the atoms of the
+    search keys with one or two characters deleted to the original
+    atoms, so :const:`MATCH_FUZZY_TYPO` can look up which atoms are
+    typos of a query word instead of testing every atom. This is many
+    times faster, but the index takes much longer to build and is
+    much larger.
+
+    :param items: items to index
+    :type items: iterable
+    :param key: function to get comparison key from ``items``. Must
+        return a ``unicode`` string. The default simply returns the item.
+    :type key: ``callable``
+    :param use_numpy: Use NumPy to filter index.
+    :type use_numpy: ``Boolean``
+    :param trigrams: Build trigram index.
+    :type trigrams: ``Boolean``
+    :param typos: Build index of atoms for :const:`MATCH_FUZZY_TYPO`.
+    :type typos: ``Boolean``
+
+    Attributes:
+        items (list): The indexed items.
+
+    """
+
+    # `KeyArrays` of unfolded and folded search keys
+    _arrays = None
+    # Dicts mapping trigrams of unfolded and folded search keys to
+    # (indices of) the items containing them
+    _trigrams = None
+    # Dict mapping atoms with characters deleted to the (space-separated)
+    # atoms
+    _deletes = None
+    # Random token that identifies this index (and pickled copies of
+    # it) in the results cached by :meth:`Workflow.filter`
+    _token = None
+
+    def __init__(self, items, key=lambda x: x, use_numpy=False,
+                 trigrams=False, typos=False):
+        """Create new :class:`FilterIndex`."""
+        self.items = list(items)
+        self._token = binascii.hexlify(os.urandom(16))
+        # Pairs of ``(search key, ASCII-folded search key)`` or ``None``
+        # for items with an empty search key
+        self._keys = []
+        for item in self.items:
+            value = key(item).strip()
+            if value == '':
+                self._keys.append(None)
+                continue
+
+            skey = _search_key(value)
+            folded = fold_to_ascii(value)
+            if folded == value:
+                self._keys.append((skey, skey))
+            else:
+                self._keys.append((skey, _search_key(folded)))
+
+        if use_numpy:
+            try:
+                from .vectorized import KeyArrays
+            except ImportError:  # NumPy not installed
+                pass
+            else:
+                unfolded = KeyArrays([k and k[0] for k in self._keys])
+                if all([k is None or k[0] is k[1] for k in self._keys]):
+                    folded = unfolded
+                else:
+                    folded = KeyArrays([k and k[1] for k in self._keys])
+                self._arrays = (unfolded, folded)
+
+        if trigrams:
+            unfolded, folded = {}, {}
+            for i, keys in enumerate(self._keys):
+                if keys is None:
+                    continue
+
+                for tri in _trigrams(keys[0][1]):
+                    unfolded.setdefault(tri, []).append(i)
+                for tri in _trigrams(keys[1][1]):
+                    folded.setdefault(tri, []).append(i)
+
+            self._trigrams = (unfolded, folded)
+
+        if typos:
+            atoms = set()
+            for keys in self._keys:
+                if keys is not None:
+                    atoms.update(keys[0][4])
+                    atoms.update(keys[1][4])
+
+            deletes = {}
+            for atom in atoms:
+                if len(atom) < _TYPO_MIN_LENGTH - 1:
+                    continue
+                # Only atoms this long can be two typos away from a word
+                depth = 2 if len(atom) >= _TYPO_LONG - 2 else 1
+                for s in _deletes(atom, depth):
+                    deletes.setdefault(s, []).append(atom)
+
+            # Atoms only contain letters and digits. Strings, unlike
+            # millions of lists, don't slow down the garbage collector.
+            self._deletes = dict([(s, ' '.join(parts))
+                                  for s, parts in deletes.iteritems()])
+
+    def _candidates(self, query, match_on, fold_diacritics):
+        """Return indices of items that may match ``query``.
+
+        :param query: query to look up
+        :type query: ``unicode``
+        :param match_on: ``MATCH_*`` flags
+        :type match_on: ``int``
+        :param fold_diacritics: whether to use folded search keys for
+            ASCII words
+        :type fold_diacritics: ``Boolean``
+        :returns: sorted list of indices or ``None`` if the index
+            can't narrow down the items
+        :rtype: ``list``
+
+        """
+        if not self._trigrams or match_on & ~_SUBSTRING_RULES:
+            return None
+
+        postings = []
+        for word in query.lower().split(' '):
+            word = word.strip()
+            index = self._trigrams[bool(fold_diacritics) and isascii(word)]
+            for tri in _trigrams(word):
+                if tri not in index:  # nothing can match
+                    return []
+                postings.append(index[tri])
+
+        if not postings:  # no words are long enough
+            return None
+
+        postings.sort(key=len)
+        found = set(postings[0])
+        for p in postings[1:]:
+            found.intersection_update(p)
+            if not found:
+                break
+
+        return sorted(found)
+
+    @property
+    def vectorized(self):
+        """Whether :meth:`Workflow.filter` uses NumPy for this index."""
+        return self._arrays is not None
+
+    def __len__(self):
+        """Number of indexed items."""
+        return len(self.items)
+
+    def __iter__(self):
+        """Iterate over indexed items."""
+        return iter(self.items)
+
+
+# Rules in the order :meth:`Workflow._score_key` tries them
+_RULE_NAMES = [
+    (MATCH_STARTSWITH, 'MATCH_STARTSWITH'),
+    (MATCH_CAPITALS, 'MATCH_CAPITALS'),
+    (MATCH_ATOM, 'MATCH_ATOM'),
+    (MATCH_INITIALS_STARTSWITH, 'MATCH_INITIALS_STARTSWITH'),
+    (MATCH_INITIALS_CONTAIN, 'MATCH_INITIALS_CONTAIN'),
+    (MATCH_SUBSTRING, 'MATCH_SUBSTRING'),
+    (MATCH_FUZZY_TYPO, 'MATCH_FUZZY_TYPO'),
+    (MATCH_ALLCHARS, 'MATCH_ALLCHARS'),
+]
+
+
+class FilterProfile(object):
+    """Where :meth:`Workflow.filter` spends its time.
+
+    .. versionadded:: 1.41
+
+    Set :attr:`Workflow.filter_profile` to a :class:`FilterProfile`,
+    and every call to :meth:`~Workflow.filter` records:
+
+    - how long it took and how many items it tested and returned,
+    - the time spent calling ``key`` and lowercasing and folding its
+      result (both are zero if ``items`` is a :class:`FilterIndex`),
+    - the time spent pre-filtering items that don't contain all the
+      characters of a query word,
+    - the time spent in each ``MATCH_*`` rule, and how many words
+      it matched (accepted) and didn't match (rejected),
+    - how many query words were found in the cache of
+      :const:`MATCH_ALLCHARS` patterns.
+
+    >>> wf.filter_profile = FilterProfile()
+    >>> results = wf.filter(query, items)
+    >>> print(wf.filter_profile.report())
+
+    Profiling is slow, so only use it during development. Rules are
+    timed one at a time, so items are filtered in a single process
+    without NumPy. The results are the same.
+
+    :param logger: logger to write a report of every call to at
+        ``DEBUG`` level, or ``None``
+    :type logger: :class:`logging.Logger`
+
+    """
+
+    def __init__(self, logger=None):
+        """Create new :class:`FilterProfile`."""
+        self.logger = logger
+        #: List of stats of each call. Each is a ``dict`` with the
+        #: keys ``query``, ``items``, ``results``, ``time``,
+        #: ``key``, ``fold``, ``prefilter`` (times in seconds),
+        #: ``rules`` (``{rule: [time, accepted, rejected]}``),
+        #: ``cache_hits`` and ``cache_misses``.
+        self.calls = []
+
+    def report(self, call=-1):
+        """Return a summary of a call to :meth:`Workflow.filter`.
+
+        :param call: index of call in :attr:`calls`. Default is
+            the last call.
+        :type call: ``int``
+        :returns: multi-line report
+        :rtype: ``unicode``
+
+        """
+        stats = self.calls[call]
+        lookups = stats['cache_hits'] + stats['cache_misses']
+        lines = [
+            'query={0!r} items={1} results={2} time={3:0.4f}s'.format(
+                stats['query'], stats['items'], stats['results'],
+                stats['time']),
+            'pattern cache: {0}/{1} hits ({2:0.0%})'.format(
+                stats['cache_hits'], lookups,
+                float(stats['cache_hits']) / lookups if lookups else 0),
+        ]
+        for name in ('key', 'fold', 'prefilter'):
+            lines.append('{0:26s} {1:0.4f}s'.format(name, stats[name]))
+
+        for rule, name in _RULE_NAMES:
+            if rule in stats['rules']:
+                t, accepted, rejected = stats['rules'][rule]
+                lines.append(
+                    '{0:26s} {1:0.4f}s  accepted={2}  rejected={3}'.format(
+                        name, t, accepted, rejected))
+        return '\n'.join(lines)
+
+    def _begin(self, query, words, cache):
+        """Add stats for a new call and return them.
+
+        :param query: stripped query
+        :type query: ``unicode``
+        :param words: query words
+        :type words: ``list``
+        :param cache: cache of MATCH_ALLCHARS matchers
+        :type cache: :class:`~workflow.util.LRUCache`
+        :returns: stats of the call
+        :rtype: ``dict``
+
+        """
+        hits = len([w for w in words if w in cache])
+        stats = dict(query=query, items=0, results=0, time=time.time(),
+                     key=0.0, fold=0.0, prefilter=0.0, rules={},
+                     cache_hits=hits, cache_misses=len(words) - hits)
+        self.calls.append(stats)
+        return stats
+
+    def _end(self, stats, results):
+        """Record end of call."""
+        stats['time'] = time.time() - stats['time']
+        stats['results'] = results
+        if self.logger is not None:
+            self.logger.debug('filter profile:\n%s',
+                              self.report(self.calls.index(stats)))
+
+    def _timed(self, func, stats, name):
+        """Wrap ``func`` to add the time spent calling it to ``stats``."""
+        def wrapper(*args):
+            start = time.time()
+            try:
+                return func(*args)
+            finally:
+                stats[name] += time.time() - start
+
+        return wrapper
+
+    def _score_key(self, score_key, stats):
+        """Wrap :meth:`Workflow._score_key` to time every rule.
+
+        Each enabled rule is tried on its own in the order
+        :meth:`Workflow._score_key` tries them, so the result is the
+        same.
+
+        """
+        rules = stats['rules']
+
+        def wrapper(skey, word, match_on):
+            start = time.time()
+            lower, mask = skey[1], skey[2]
+            if mask is None:
+                found = word.chars <= set(lower)
+            else:
+                found = word.mask & mask == word.mask
+            stats['prefilter'] += time.time() - start
+
+            for rule, _ in _RULE_NAMES:
+                if not match_on & rule:
+                    continue
+                # only a typo can be missing characters
+                if not found and rule != MATCH_FUZZY_TYPO:
+                    continue
+                counts = rules.setdefault(rule, [0.0, 0, 0])
+                start = time.time()
+                score, matched = score_key(skey, word, rule)
+                counts[0] += time.time() - start
+                if matched is None:
+                    counts[2] += 1
+                else:
+                    counts[1] += 1
+                    return score, matched
+
+            return (0, None)
+
+        return wrapper
+
+
+def _best_results(results, ascending, max_results):
+    """Sort results of :meth:`Workflow.filter`.
+
+    :param results: list of ``(sort key, (item, score, rule))``
+    :type results: ``list``
+    :returns: the best ``max_results`` (or all) ``results`` in order
+
+    """
+    # If only the best `max_results` are wanted, select them with
+    # a heap instead of sorting all matches
+    if max_results and len(results) > max_results:
+        if ascending:
+            return heapq.nlargest(max_results, results)
+        return heapq.nsmallest(max_results, results)
+
+    results.sort(reverse=ascending)
+    return results
+
+
+def _sort_results(results, ascending, max_results):
+    """Sort results of :meth:`Workflow.filter` and discard sort keys.
+
+    :param results: list of ``(sort key, (item, score, rule))``
+    :type results: ``list``
+    :returns: list of ``(item, score, rule)``
+
+    """
+    return [t[1] for t in _best_results(results, ascending, max_results)]
+
+
+def _keys_hash(values):
+    """Return MD5 hex digest of the search keys ``values``.
+
+    :param values: search keys of all items
+    :type values: ``list``
+    :rtype: ``str``
+
+    """
+    return hashlib.md5('\0'.join(values).encode('utf-8')).hexdigest()
+
+
+def _key_fields(key):
+    """Return ``key`` of :meth:`Workflow.filter` as ``(key, weight)`` pairs.
+
+    :param key: function or list of ``(function, weight)`` tuples
+    :returns: list of ``(function, weight)`` or ``None`` if ``key``
+        is a single function
+    :rtype: ``list``
+
+    """
+    if callable(key):
+        return None
+    return [(func, weight) for func, weight in key]
+
+
+def _key_fingerprint(key):
+    """Return a value that identifies ``key`` across processes.
+
+    Functions are identified by their code and the values of the
+    variables they close over. Other callables are identified by their
+    ``repr()``, which usually includes their address, so they only match
+    in the same process.
+
+    :param key: function or list of ``(function, weight)`` tuples
+    :returns: MD5 hex digest
+    :rtype: ``str``
+
+    """
+    fields = _key_fields(key)
+    if fields is None:
+        fields = [(key, None)]
+
+    h = hashlib.md5()
+    for func, weight in fields:
+        code = getattr(func, '__code__', None)
+        if code is None:
+            h.update(repr((func, weight)).encode('utf-8'))
+            continue
+
+        consts = [c for c in code.co_consts
+                  if not hasattr(c, 'co_code')]  # nested code objects
+        cells = [cell.cell_contents for cell in func.__closure__ or ()]
+        h.update(repr((func.__module__, code.co_code, consts, code.co_names,
+                       cells, weight)).encode('utf-8'))
+    return h.hexdigest()
+
+
+def _primary_key(key):
+    """Return function that gets the sort value from items."""
+    if callable(key):
+        return key
+    return key[0][0]
+
+
+# Number of queries :meth:`Workflow.filter` caches the results of
+_FILTER_CACHE_SIZE = 20
+# Maximum number of results (of all queries) in the filter cache
+_FILTER_CACHE_MAX_HITS = 10000
+
+
+# ``(workflow, args)`` for :func:`_filter_chunk`. Set before the
+# worker processes are forked, so they inherit the items instead of
+# having to unpickle them
+_filter_job = None
+
+
+def _filter_chunk(bounds):
+    """Filter a slice of the items in :data:`_filter_job`.
+
+    :param bounds: ``(start, end)`` indices of slice
+    :type bounds: ``tuple``
+    :returns: list of ``(index, score, rule)`` of results
+
+    """
+    wf, args, boost = _filter_job
+    items = args[1]
+    if isinstance(items, FilterIndex):
+        items = items.items
+
+    start, end = bounds
+    results, _ = wf._filter(*args, candidates=xrange(start, end),
+                            boost=boost)
+    # Return indices, not items, so the items needn't be pickled
+    ids = {id(items[i]): i for i in xrange(start, end)}
+    return [(ids[id(item)], score, rule) for item, score, rule in results]
+
+
 ####################################################################
 # Implementation classes
 ####################################################################
@@ -699,11 +1628,143 @@ class PickleSerializer(object):
         return pickle.dump(obj, file_obj, protocol=-1)
 
 
+try:
+    import lzma
+except ImportError:  # not in Python 2's standard library
+    try:
+        from backports import lzma
+    except ImportError:
+        lzma = None
+
+
+class _CompressedWriter(object):
+    """File-like object that compresses data written to ``file_obj``.
+
+    Writes are buffered, so serializers that write many small chunks
+    don't call the compressor for each one.
+
+    """
+
+    def __init__(self, file_obj, compressor, bufsize=65536):
+        """Create new :class:`_CompressedWriter`."""
+        self.file_obj = file_obj
+        self.compressor = compressor
+        self.bufsize = bufsize
+        self._buf = []
+        self._size = 0
+
+    def write(self, data):
+        """Add ``data`` to compressed output."""
+        self._buf.append(data)
+        self._size += len(data)
+        if self._size >= self.bufsize:
+            self._compress()
+
+    def close(self):
+        """Write remaining compressed data. Doesn't close ``file_obj``."""
+        self._compress()
+        self.file_obj.write(self.compressor.flush())
+
+    def _compress(self):
+        """Compress buffered data."""
+        if self._buf:
+            self.file_obj.write(self.compressor.compress(b''.join(self._buf)))
+            self._buf = []
+            self._size = 0
+
+
+class CompressedSerializer(object):
+    """Compress the files of another serializer.
+
+    .. versionadded:: 1.41
+
+    Output is compressed as it's written, so the uncompressed data are
+    never all in memory. When loading, the whole file is decompressed
+    at once, which is much faster than decompressing it in step with
+    the wrapped serializer.
+
+    Compressed variants of the ``cpickle`` and ``json`` serializers are
+    registered as ``cpickle.gz``, ``json.gz``, ``cpickle.zlib`` and
+    ``json.zlib``, and if the :mod:`lzma` module is available (it's in
+    `backports.lzma <https://pypi.org/project/backports.lzma/>`_ on
+    Python 2), ``cpickle.xz`` and ``json.xz``.
+
+    :param serializer: serializer to compress the output of
+    :param compression: ``gzip``, ``zlib`` or ``lzma``
+    :type compression: ``unicode``
+    :param level: compression level (``0``-``9``)
+    :type level: ``int``
+
+    """
+
+    def __init__(self, serializer, compression='gzip', level=6):
+        """Create new :class:`CompressedSerializer`."""
+        if compression == 'lzma' and lzma is None:
+            raise ValueError('lzma module is not installed')
+        if compression not in ('gzip', 'zlib', 'lzma'):
+            raise ValueError('Unknown compression: {0!r}'.format(
+                             compression))
+
+        self.serializer = serializer
+        self.compression = compression
+        self.level = level
+
+    def load(self, file_obj):
+        """Load serialized object from open compressed file.
+
+        :param file_obj: file handle
+        :type file_obj: ``file`` object
+        :returns: object loaded from file
+        :rtype: object
+
+        """
+        data = file_obj.read()
+        if self.compression == 'gzip':
+            data = zlib.decompress(data, 16 + zlib.MAX_WBITS)
+        elif self.compression == 'zlib':
+            data = zlib.decompress(data)
+        else:
+            data = lzma.decompress(data)
+
+        return self.serializer.load(StringIO(data))
+
+    def dump(self, obj, file_obj):
+        """Serialize and compress object ``obj`` to open file.
+
+        :param obj: Python object to serialize
+        :type obj: object supported by wrapped serializer
+        :param file_obj: file handle
+        :type file_obj: ``file`` object
+
+        """
+        if self.compression == 'gzip':
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED,
+                                          16 + zlib.MAX_WBITS)
+        elif self.compression == 'zlib':
+            compressor = zlib.compressobj(self.level)
+        else:
+            compressor = lzma.LZMACompressor(preset=self.level)
+
+        writer = _CompressedWriter(file_obj, compressor)
+        self.serializer.dump(obj, writer)
+        writer.close()
+
+
 # Set up default manager and register built-in serializers
 manager = SerializerManager()
 manager.register('cpickle', CPickleSerializer)
 manager.register('pickle', PickleSerializer)
 manager.register('json', JSONSerializer)
+manager.register('cpickle.gz', CompressedSerializer(CPickleSerializer))
+manager.register('json.gz', CompressedSerializer(JSONSerializer))
+manager.register('cpickle.zlib',
+                 CompressedSerializer(CPickleSerializer, 'zlib'))
+manager.register('json.zlib', CompressedSerializer(JSONSerializer, 'zlib'))
+if lzma is not None:
+    manager.register('cpickle.xz',
+                     CompressedSerializer(CPickleSerializer, 'lzma'))
+    manager.register('json.xz', CompressedSerializer(JSONSerializer, 'lzma'))
+manager.register('columns', ColumnarSerializer)
 
 
 class Item(object):
@@ -964,12 +2025,34 @@ class Workflow(object):
         self._version = UNSET
         # Version from last workflow run
         self._last_version_run = UNSET
-        # Cache for regex patterns created for filter keys
-        self._search_pattern_cache = {}
         #: Prefix for all magic arguments.
         #: The default value is ``workflow:`` so keyword
         #: ``config`` would match user query ``workflow:config``.
         self.magic_prefix = 'workflow:'
+        #: :meth:`filter` splits lists (or :class:`FilterIndex` objects)
+        #: of at least this many items across several processes.
+        #: ``0`` (the default) always filters in the current process.
+        self.filter_parallel_min = 0
+        #: Number of processes :meth:`filter` uses for large lists.
+        #: The default (``None``) is one per CPU.
+        self.filter_processes = None
+        #: :class:`~workflow.util.LRUCache` for the results of
+        #: :meth:`fold_to_ascii` and :meth:`dumbify_punctuation`.
+        #: ``None`` (the default) turns caching off.
+        self.text_cache = None
+        #: :class:`FilterProfile` that records where :meth:`filter`
+        #: spends its time. ``None`` (the default) turns profiling off.
+        self.filter_profile = None
+        #: Names of caches whose stale data :meth:`cached_data` returned
+        #: while they're being updated in the background.
+        self.revalidating = set()
+        #: How many seconds :meth:`cached_data` waits for another process
+        #: that is already regenerating the same stale data. ``None``
+        #: (the default) turns off coordination between processes. If
+        #: ``0``, it doesn't wait: it regenerates the data itself.
+        self.cache_lock_timeout = None
+        # :class:`~workflow.util.LockFile` objects for cache files
+        self._cache_locks = {}
         #: Mapping of available magic arguments. The built-in magic
         #: arguments are registered by default. To add your own magic arguments
         #: (or override built-ins), add a key:value pair where the key is
@@ -1594,8 +2677,7 @@ class Workflow(object):
 
             return None
 
-        with open(data_path, 'rb') as file_obj:
-            data = serializer.load(file_obj)
+        data = self._load_file(data_path, serializer)
 
         self.logger.debug('stored data loaded: %s', data_path)
 
@@ -1650,6 +2732,8 @@ class Workflow(object):
                 'Invalid serializer `{0}`. Register your serializer with '
                 '`manager.register()` first.'.format(serializer_name))
 
+        self._forget_file(data_path)
+
         if data is None:  # Delete cached data
             delete_paths((metadata_path, data_path))
             return
@@ -1668,18 +2752,41 @@ class Workflow(object):
 
         self.logger.debug('saved data: %s', data_path)
 
-    def cached_data(self, name, data_func=None, max_age=60):
+    def cached_data(self, name, data_func=None, max_age=60,
+                    revalidate=None):
         """Return cached data if younger than ``max_age`` seconds.
 
         Retrieve data from cache or re-generate and re-cache data if
         stale/non-existant. If ``max_age`` is 0, return cached data no
         matter how old.
 
+        .. versionadded:: 1.41
+
+        If :attr:`cache_lock_timeout` is set, only one process at a
+        time regenerates stale data. If another process is already doing
+        so, stale data are returned, or if there are none,
+        :meth:`cached_data` waits up to :attr:`cache_lock_timeout`
+        seconds for the other process to save fresh data. See
+        :attr:`cache_stats`.
+
+        If ``revalidate`` is set, stale data are returned at once, and
+        ``revalidate`` is run with
+        :func:`~workflow.background.run_in_background` to update the
+        cache. ``name`` is added to :attr:`revalidating`, so you can set
+        :attr:`Workflow3.rerun` to show the fresh data when they're
+        ready. If there are no cached data, ``data_func`` is called as
+        usual, or if it's not set, ``revalidate`` is started and
+        ``None`` returned.
+
         :param name: name of datastore
         :param data_func: function to (re-)generate data.
         :type data_func: ``callable``
         :param max_age: maximum age of cached data in seconds
         :type max_age: ``int``
+        :param revalidate: command that saves fresh data with
+            :meth:`cache_data`, e.g. ``['/usr/bin/python',
+            'update.py']``
+        :type revalidate: ``list``
         :returns: cached data, return value of ``data_func`` or ``None``
             if ``data_func`` is not set
 
@@ -1688,20 +2795,166 @@ class Workflow(object):
 
         cache_path = self.cachefile('%s.%s' % (name, self.cache_serializer))
         age = self.cached_data_age(name)
+        fresh = age < max_age or max_age == 0
 
-        if (age < max_age or max_age == 0) and os.path.exists(cache_path):
+        if (fresh or revalidate) and os.path.exists(cache_path):
+            if not fresh:
+                self._revalidate(name, revalidate)
 
-            with open(cache_path, 'rb') as file_obj:
-                self.logger.debug('loading cached data: %s', cache_path)
-                return serializer.load(file_obj)
+            self.logger.debug('loading cached data: %s', cache_path)
+            return self._load_file(cache_path, serializer)
 
         if not data_func:
+            if revalidate:
+                self._revalidate(name, revalidate)
             return None
 
-        data = data_func()
-        self.cache_data(name, data)
+        if self.cache_lock_timeout is None:
+            data = data_func()
+            self.cache_data(name, data)
+            return data
 
-        return data
+        return self._regenerate(name, data_func, max_age)
+
+    @property
+    def cache_stats(self):
+        """How often :meth:`cached_data` had to wait for other processes.
+
+        .. versionadded:: 1.41
+
+        Counts of all the workflow's processes since the cache was last
+        cleared: ``contended`` in total, of which ``stale`` returned
+        stale data, ``waited`` waited for fresh data and ``timeouts``
+        gave up waiting. Only counted if :attr:`cache_lock_timeout` is
+        set.
+
+        :returns: ``dict`` of counts
+        :rtype: ``dict``
+
+        """
+        stats = dict(contended=0, stale=0, waited=0, timeouts=0)
+        path = self.cachefile('__workflow_cache_stats.json')
+        if os.path.exists(path):
+            with open(path, 'rb') as fp:
+                stats.update(json.load(fp))
+        return stats
+
+    def _count_contention(self, *names):
+        """Add 1 to :attr:`cache_stats` ``names``.
+
+        :param names: names of counters
+        :type names: ``unicode``
+
+        """
+        path = self.cachefile('__workflow_cache_stats.json')
+        lock = self._cache_lock(path)
+        try:
+            # LockFile waits forever if timeout is 0
+            if not lock.acquire(blocking=bool(self.cache_lock_timeout)):
+                return
+        except AcquisitionError:  # statistics aren't worth waiting for
+            return
+
+        try:
+            stats = self.cache_stats
+            for name in names:
+                stats[name] += 1
+            with atomic_writer(path, 'wb') as fp:
+                json.dump(stats, fp)
+        finally:
+            lock.release()
+
+    def _cache_lock(self, path):
+        """Return :class:`~workflow.util.LockFile` for cache file ``path``.
+
+        Locks are reused, so each one registers only one :mod:`atexit`
+        handler.
+
+        :param path: path of cache file
+        :type path: ``unicode``
+        :returns: lock with a timeout of :attr:`cache_lock_timeout`
+        :rtype: :class:`~workflow.util.LockFile`
+
+        """
+        lock = self._cache_locks.get(path)
+        if lock is None:
+            lock = self._cache_locks[path] = LockFile(path)
+        lock.timeout = self.cache_lock_timeout
+        return lock
+
+    def _regenerate(self, name, data_func, max_age):
+        """Regenerate cached data unless another process is doing so.
+
+        Only the process that holds the lock on the cache file calls
+        ``data_func``. Other processes return the stale data or, if
+        there are none, wait up to :attr:`cache_lock_timeout` seconds
+        for the data (not at all if it's ``0``). If they time out, they
+        call ``data_func`` too.
+
+        :param name: name of datastore
+        :type name: ``unicode``
+        :param data_func: function to (re-)generate data.
+        :type data_func: ``callable``
+        :param max_age: maximum age of cached data in seconds
+        :type max_age: ``int``
+        :returns: cached data or return value of ``data_func``
+
+        """
+        serializer = manager.serializer(self.cache_serializer)
+        cache_path = self.cachefile('%s.%s' % (name, self.cache_serializer))
+        lock = self._cache_lock(cache_path)
+
+        if not lock.acquire(blocking=False):
+            if os.path.exists(cache_path):
+                self._count_contention('contended', 'stale')
+                self.logger.info('cache "%s" is being updated by another '
+                                 'process, using stale data', name)
+                return self._load_file(cache_path, serializer)
+
+            # LockFile waits forever if timeout is 0
+            wait = bool(self.cache_lock_timeout)
+            if wait:
+                self.logger.info('waiting for another process to update '
+                                 'cache "%s" ...', name)
+            try:
+                acquired = lock.acquire(blocking=wait)
+            except AcquisitionError:
+                acquired = False
+
+            if not acquired:
+                self._count_contention('contended', 'timeouts')
+                self.logger.warning('timed out waiting for cache "%s"', name)
+                data = data_func()
+                self.cache_data(name, data)
+                return data
+
+            self._count_contention('contended', 'waited')
+
+        try:
+            # Data may have been saved while this process waited
+            if (os.path.exists(cache_path) and
+                    (max_age == 0 or self.cached_data_age(name) < max_age)):
+                return self._load_file(cache_path, serializer)
+
+            data = data_func()
+            self.cache_data(name, data)
+            return data
+        finally:
+            lock.release()
+
+    def _revalidate(self, name, command):
+        """Update cache ``name`` by running ``command`` in the background.
+
+        :param name: name of datastore
+        :type name: ``unicode``
+        :param command: command that updates the cache
+        :type command: ``list``
+
+        """
+        from .background import run_in_background
+        # does nothing if the job is already running
+        run_in_background('__workflow_revalidate_' + name, command)
+        self.revalidating.add(name)
 
     def cache_data(self, name, data):
         """Save ``data`` to cache under ``name``.
@@ -1717,6 +2970,7 @@ class Workflow(object):
         serializer = manager.serializer(self.cache_serializer)
 
         cache_path = self.cachefile('%s.%s' % (name, self.cache_serializer))
+        self._forget_file(cache_path)
 
         if data is None:
             if os.path.exists(cache_path):
@@ -1729,6 +2983,98 @@ class Workflow(object):
 
         self.logger.debug('cached data: %s', cache_path)
 
+    @property
+    def memory_cache(self):
+        """In-memory cache of data loaded from files.
+
+        .. versionadded:: 1.41
+
+        :class:`~workflow.util.LRUCache` for the objects loaded by
+        :meth:`cached_data` and :meth:`stored_data`. It's shared by all
+        :class:`Workflow` objects in the process. The size of an object
+        is the size of its file, so set the cache's ``maxbytes`` to
+        limit the total size. ``None`` (the default) turns caching off.
+
+        :getter: Return the cache
+        :setter: Set the cache for this process
+        :type: :class:`~workflow.util.LRUCache`
+
+        """
+        return _memory_cache
+
+    @memory_cache.setter
+    def memory_cache(self, cache):
+        """Set the in-memory cache for this process.
+
+        :param cache: cache or ``None`` to turn caching off
+        :type cache: :class:`~workflow.util.LRUCache`
+
+        """
+        global _memory_cache
+        _memory_cache = cache
+
+    def clear_memory_cache(self, name=None):
+        """Remove data from :attr:`memory_cache`.
+
+        .. versionadded:: 1.41
+
+        Data are reloaded anyway when their file's modification time
+        or size changes. Call this if another process may have
+        changed a file without changing either.
+
+        :param name: name of cached or stored data to remove. Default
+            is to remove all data.
+        :type name: ``unicode``
+
+        """
+        if self.memory_cache is None:
+            return
+
+        if name is None:
+            self.memory_cache.clear()
+            return
+
+        self._forget_file(self.cachefile('%s.%s' % (name,
+                                                    self.cache_serializer)))
+        for serializer_name in manager.serializers:
+            self._forget_file(self.datafile('{0}.{1}'.format(
+                name, serializer_name)))
+
+    def _load_file(self, path, serializer):
+        """Load data from ``path`` or :attr:`memory_cache`.
+
+        Data in :attr:`memory_cache` are used if the file's modification
+        time and size haven't changed since they were loaded, and they
+        haven't been closed (e.g. :class:`~workflow.columnar.Rows`).
+
+        :param path: path to data file
+        :type path: ``unicode``
+        :param serializer: serializer to load file with
+        :returns: deserialized data
+
+        """
+        if self.memory_cache is None:
+            with open(path, 'rb') as file_obj:
+                return serializer.load(file_obj)
+
+        st = os.stat(path)
+        stamp = (st.st_mtime, st.st_size)
+        cached = self.memory_cache.get(path)
+        if (cached is not None and cached[0] == stamp and
+                not getattr(cached[1], 'closed', False)):
+            return cached[1]
+
+        with open(path, 'rb') as file_obj:
+            data = serializer.load(file_obj)
+
+        self.memory_cache.set(path, (stamp, data), st.st_size)
+        return data
+
+    def _forget_file(self, path):
+        """Remove data loaded from ``path`` from :attr:`memory_cache`."""
+        if self.memory_cache is not None:
+            self.memory_cache.pop(path)
+
     def cached_data_fresh(self, name, max_age):
         """Whether cache `name` is less than `max_age` seconds old.
 
@@ -1762,9 +3108,109 @@ class Workflow(object):
 
         return time.time() - os.stat(cache_path).st_mtime
 
+    def filter_index(self, name, items, key=lambda x: x, version=None,
+                     use_numpy=False, trigrams=False, typos=False):
+        """Return :class:`FilterIndex` of ``items`` from the cache.
+
+        .. versionadded:: 1.41
+
+        The index is saved in the cache directory under ``name`` using
+        :attr:`cache_serializer` (which must be able to pickle objects),
+        and is only rebuilt when the items change.
+
+        Pass ``version``, e.g. the modification time of the file the
+        items are loaded from: the index is rebuilt when ``version``
+        changes. ``items`` may then be a function that returns the
+        items, which is only called if the index needs rebuilding, so
+        loading a current index costs nothing but reading the cache.
+
+        If ``version`` is ``None``, ``items`` are loaded, pickled and
+        their search keys hashed on every call to find out whether they
+        have changed. This takes time proportional to the number of
+        items (about as long as building a small index), so use it
+        only for small lists or ones that are filtered only once.
+
+        :param name: name of cached index
+        :type name: ``unicode``
+        :param items: items to index or function that returns them
+        :type items: iterable or ``callable``
+        :param key: function to get search key from ``items``
+        :type key: ``callable``
+        :param version: version of the items
+        :param use_numpy: passed to :class:`FilterIndex`
+        :type use_numpy: ``Boolean``
+        :param trigrams: passed to :class:`FilterIndex`
+        :type trigrams: ``Boolean``
+        :param typos: passed to :class:`FilterIndex`
+        :type typos: ``Boolean``
+        :returns: :class:`FilterIndex` of ``items``
+
+        """
+        options = (_INDEX_FORMAT, bool(use_numpy), bool(trigrams),
+                   bool(typos))
+        if version is None:
+            if callable(items):
+                items = items()
+            items = list(items)
+            self.logger.debug('filter index "%s": no version, hashing '
+                              '%d items ...', name, len(items))
+            version = (hashlib.md5(cPickle.dumps(items, -1)).hexdigest(),
+                       _keys_hash([key(item) for item in items]))
+
+        data = self.cached_data(name, max_age=0)
+        if (isinstance(data, dict) and data.get('version') == version and
+                data.get('options') == options):
+            return data['index']
+
+        self.logger.debug('building filter index "%s" ...', name)
+        if callable(items):
+            items = items()
+        index = FilterIndex(items, key, use_numpy, trigrams, typos)
+        self.cache_data(name, {'version': version, 'options': options,
+                               'index': index})
+        return index
+
+    def search_index(self, name):
+        """Open persistent search index ``name``.
+
+        .. versionadded:: 1.41
+
+        The index is an SQLite database in the data directory, which
+        is created if it doesn't exist. See
+        :class:`~workflow.search.SearchIndex`.
+
+        :param name: name of index
+        :type name: ``unicode``
+        :returns: :class:`~workflow.search.SearchIndex`
+
+        """
+        from .search import SearchIndex
+        return SearchIndex(self.datafile(name + '.sqlite'))
+
+    def frecency(self, name='frecency', half_life=None):
+        """Open usage counts ``name`` for ranking results.
+
+        .. versionadded:: 1.41
+
+        The counts are saved in the data directory. See
+        :class:`~workflow.frecency.Frecency`.
+
+        :param name: name of counts
+        :type name: ``unicode``
+        :param half_life: seconds after which a use counts half as much.
+            Default is two weeks.
+        :type half_life: ``float``
+        :returns: :class:`~workflow.frecency.Frecency`
+
+        """
+        from .frecency import HALF_LIFE, Frecency
+        return Frecency(self.datafile(name + '.frecency'),
+                        half_life or HALF_LIFE)
+
     def filter(self, query, items, key=lambda x: x, ascending=False,
                include_score=False, min_score=0, max_results=0,
-               match_on=MATCH_ALL, fold_diacritics=True):
+               match_on=MATCH_ALL, fold_diacritics=True, boost=None,
+               cache=False):
         """Fuzzy search filter. Returns list of ``items`` that match ``query``.
 
         ``query`` is case-insensitive. Any item that does not contain the
@@ -1775,12 +3221,14 @@ class Workflow(object):
 
         :param query: query to test items against
         :type query: ``unicode``
-        :param items: iterable of items to test
-        :type items: ``list`` or ``tuple``
+        :param items: iterable of items to test or a :class:`FilterIndex`
+            of the items. ``key`` is ignored if ``items`` is an index.
+        :type items: ``list``, ``tuple`` or :class:`FilterIndex`
         :param key: function to get comparison key from ``items``.
             Must return a ``unicode`` string. The default simply returns
-            the item.
-        :type key: ``callable``
+            the item. May also be a list of ``(function, weight)`` tuples
+            to match several keys (see below).
+        :type key: ``callable`` or ``list``
         :param ascending: set to ``True`` to get worst matches first
         :type ascending: ``Boolean``
         :param include_score: Useful for debugging the scoring algorithm.
@@ -1798,6 +3246,15 @@ class Workflow(object):
         :param fold_diacritics: Convert search keys to ASCII-only
             characters if ``query`` only contains ASCII characters.
         :type fold_diacritics: ``Boolean``
+        :param boost: function that returns points to add to the score
+            of an item that matches ``query``, e.g. from
+            :meth:`Frecency.booster() <workflow.frecency.Frecency.booster>`.
+        :type boost: ``callable``
+        :param cache: save results in the cache directory and return
+            them if :meth:`filter` is called again with the same query,
+            options and items. ``True`` or the version of ``items``
+            (see below)
+        :type cache: ``Boolean`` or any value with a stable ``repr()``
         :returns: list of ``items`` matching ``query`` or list of
             ``(item, score, rule)`` `tuples` if ``include_score`` is ``True``.
             ``rule`` is the ``MATCH_*`` rule that matched the item.
@@ -1833,6 +3290,17 @@ class Workflow(object):
         9. :const:`MATCH_ALL`
             Combination of all the above.
 
+        .. versionadded:: 1.41
+
+        :const:`MATCH_FUZZY_TYPO` is not part of :const:`MATCH_ALL`, and
+        must be added explicitly (``match_on=MATCH_ALL | MATCH_FUZZY_TYPO``).
+        It is tested between :const:`MATCH_SUBSTRING` and
+        :const:`MATCH_ALLCHARS`, and matches items with an atom that is
+        within Damerau-Levenshtein distance 1 of ``query`` (distance 2 if
+        ``query`` has 8 or more characters), e.g. ``fierfox`` matches
+        "Firefox". Query words shorter than 4 characters are not matched.
+        Pass a :class:`FilterIndex` built with ``typos=True`` to look up
+        typos instead of testing every atom.
 
         :const:`MATCH_ALLCHARS` is considerably slower than the other
         tests and provides much less accurate results.
@@ -1862,87 +3330,629 @@ class Workflow(object):
         If ``query`` contains non-ASCII characters, search keys will not be
         altered.
 
+        **Multiple search keys**
+
+        .. versionadded:: 1.41
+
+        To match items on several fields, pass a list of ``(function,
+        weight)`` tuples as ``key``, e.g. ``[(get_title, 2), (get_tags,
+        1)]``. Each word of ``query`` is scored against every field, and
+        the best score multiplied by the field's weight counts towards
+        the item's score, so different words may match different fields.
+        Items with the same score are sorted by the first field.
+
+        **Pre-computed search keys**
+
+        .. versionadded:: 1.41
+
+        Pass a :class:`FilterIndex` instead of a list of items to avoid
+        re-computing the search keys (and their folded forms, atoms and
+        initials) every time :meth:`filter` is called.
+
+        **Parallel filtering**
+
+        .. versionadded:: 1.41
+
+        If :attr:`filter_parallel_min` is set, ``items`` lists (or
+        :class:`FilterIndex` objects) with at least that many items are
+        split into slices, which are filtered by a pool of
+        :attr:`filter_processes` processes. The results are the same as
+        filtering in a single process, which :meth:`filter` falls back
+        to if the job can't be sent to the workers.
+
+        **Cached results**
+
+        .. versionadded:: 1.41
+
+        If ``cache`` is set, the positions in ``items`` and scores of
+        the results of the last 20 queries are saved in the cache
+        directory. When the same query is filtered again with the same
+        options and items, the results are read from the cache instead
+        of scoring all the items. Results are never cached if ``boost``
+        is set.
+
+        Pass a version of ``items`` as ``cache``, e.g. the modification
+        time of the file they're loaded from (results are also keyed on
+        the code of ``key``), or a :class:`FilterIndex`
+        (which identifies itself) and ``cache=True``. With a list and
+        ``cache=True``, the search keys of all the items are hashed on
+        every call, which is much faster than scoring them, but still
+        takes time proportional to the number of items.
+
+        """
+        args = (query, items, key, ascending, include_score, min_score,
+                max_results, match_on, fold_diacritics)
+        if (cache is not False and cache is not None and boost is None and
+                query and query.strip()):
+            return self._filter_cached(cache, *args)
+
+        return self._filter_dispatch(args, boost)
+
+    def _filter_dispatch(self, args, boost=None):
+        """Filter items in one process or several.
+
+        :param args: arguments of :meth:`_filter`
+        :type args: ``tuple``
+        :param boost: function that returns bonus points for an item
+        :type boost: ``callable``
+        :returns: results of :meth:`filter`
+        :rtype: ``list``
+
         """
+        query, items = args[:2]
+        if (self.filter_parallel_min and self.filter_profile is None and
+                query and query.strip() and
+                isinstance(items, (list, tuple, FilterIndex)) and
+                len(items) >= self.filter_parallel_min and
+                not getattr(items, 'vectorized', False)):
+            processes = self.filter_processes or multiprocessing.cpu_count()
+            # daemonic processes can't have children
+            if (processes > 1 and
+                    not multiprocessing.current_process().daemon):
+                # Workers inherit the job, but the function is pickled.
+                # Check it here, so errors in workers aren't mistaken
+                # for pickling errors.
+                try:
+                    cPickle.dumps(_filter_chunk, -1)
+                except (pickle.PicklingError, cPickle.PicklingError,
+                        TypeError) as err:
+                    self.logger.debug('filter: filtering in one process: '
+                                      "can't send job to workers: %s", err)
+                else:
+                    return self._filter_parallel(processes, *args,
+                                                 boost=boost)
+
+        results, _ = self._filter(*args, boost=boost,
+                                  profile=self.filter_profile)
+        return results
+
+    def _filter_cached(self, version, query, items, key, ascending,
+                       include_score, min_score, max_results, match_on,
+                       fold_diacritics):
+        """Implement :meth:`filter` with ``cache`` set.
+
+        Results are saved as ``(index, score, rule)``, so when they're
+        read from the cache, only the result items have to be looked up.
+
+        """
+        if not isinstance(items, (list, tuple, FilterIndex)):
+            items = list(items)
+
+        fields = _key_fields(key)
+        if fields is not None:
+            fields = [weight for _, weight in fields]
+
+        if version is not True:
+            digest = ('version', len(items), version, _key_fingerprint(key))
+        elif isinstance(items, FilterIndex):
+            digest = ('index', items._token)
+            fields = None
+        elif fields is None:
+            digest = _keys_hash([key(item) for item in items])
+        else:
+            digest = _keys_hash([func(item) for item in items
+                                 for func, _ in _key_fields(key)])
+
+        sequence = items
+        if isinstance(items, FilterIndex):
+            sequence = items.items
+
+        fold_diacritics = self.settings.get('__workflow_diacritic_folding',
+                                            fold_diacritics)
+        options = (query.strip(), ascending, min_score, max_results,
+                   match_on, bool(fold_diacritics), fields, digest)
+        h = hashlib.md5(repr(options).encode('utf-8')).hexdigest()
+
+        name = '__workflow_filter_results'
+        entries = self.cached_data(name, max_age=0) or []
+        for k, hits in entries:
+            if k == h:
+                self.logger.debug('filter: results for %r from cache', query)
+                results = [(sequence[i], score, rule)
+                           for i, score, rule in hits]
+                break
+        else:
+            results = self._filter_dispatch(
+                (query, items, key, ascending, True, min_score, max_results,
+                 match_on, fold_diacritics))
+            # Items are identified by their position
+            ids = {id(item): i for i, item in enumerate(sequence)}
+            hits = [(ids[id(item)], score, rule)
+                    for item, score, rule in results]
+            entries = [(h, hits)] + entries[:_FILTER_CACHE_SIZE - 1]
+            # Drop the oldest results if there are too many
+            total = 0
+            for i, (_, hits) in enumerate(entries):
+                total += len(hits)
+                if total > _FILTER_CACHE_MAX_HITS:
+                    del entries[i:]
+                    break
+            self.cache_data(name, entries)
+
+        if include_score:
+            return results
+        return [t[0] for t in results]
+
+    def ifilter(self, query, items, key=lambda x: x, ascending=False,
+                include_score=False, min_score=0, max_results=0,
+                match_on=MATCH_ALL, fold_diacritics=True, boost=None,
+                batch_size=1000):
+        """Like :meth:`filter`, but for any iterable of ``items``.
+
+        .. versionadded:: 1.41
+
+        ``items`` are read and scored in batches of ``batch_size``, and
+        only the best ``max_results`` results are kept in memory, so
+        ``items`` may be a generator over a dataset that's too large to
+        load all at once, such as the rows of an SQLite cursor or the
+        lines of a file.
+
+        The results are the same as those of :meth:`filter`, but as
+        they can only be sorted once all ``items`` have been read, they
+        are yielded after ``items`` is exhausted. Set ``max_results``
+        to bound memory use: if it is ``0``, all matching items are
+        kept.
+
+        If ``query`` is empty, ``items`` are yielded as they are read.
+
+        :param items: iterable of items to test
+        :param batch_size: number of items to score at a time
+        :type batch_size: ``int``
+        :returns: generator of ``items`` matching ``query`` or of
+            ``(item, score, rule)`` tuples if ``include_score`` is ``True``.
+
+        See :meth:`filter` for the other parameters.
+
+        """
+        if not query or not query.strip():
+            for item in items:
+                yield item
+            return
+
+        # Load settings once instead of for every batch
+        fold_diacritics = self.settings.get('__workflow_diacritic_folding',
+                                            fold_diacritics)
+
+        primary = _primary_key(key)
+        results = []
+        items = iter(items)
+        while True:
+            batch = list(itertools.islice(items, batch_size))
+            if not batch:
+                break
+
+            found, _ = self._filter(query, batch, key, ascending, True,
+                                    min_score, max_results, match_on,
+                                    fold_diacritics, boost=boost,
+                                    profile=self.filter_profile)
+            for item, score, rule in found:
+                value = primary(item).strip().lower()
+                results.append(((100.0 / score, value, score),
+                                (item, score, rule)))
+
+            # Discard results that can no longer make the cut
+            if max_results and len(results) > max_results:
+                results = _best_results(results, ascending, max_results)
+
+        for _, t in _best_results(results, ascending, max_results):
+            if include_score:
+                yield t
+            else:
+                yield t[0]
+
+    def _filter_parallel(self, processes, query, items, key, ascending,
+                         include_score, min_score, max_results, match_on,
+                         fold_diacritics, boost=None):
+        """Implement :meth:`filter` using a pool of ``processes``.
+
+        ``items`` is split into one slice per process, and the
+        (best ``max_results``) results of each slice are merged.
+
+        """
+        global _filter_job
+
+        index = None
+        if isinstance(items, FilterIndex):
+            index = items._keys
+
+        # Load settings before forking, so it's only done once
+        fold_diacritics = self.settings.get('__workflow_diacritic_folding',
+                                            fold_diacritics)
+
+        size = len(items) // processes + 1
+        chunks = [(i, min(i + size, len(items)))
+                  for i in range(0, len(items), size)]
+        self.logger.debug('filter: %d items in %d processes',
+                          len(items), len(chunks))
+
+        _filter_job = (self, (query, items, key, ascending, True, min_score,
+                              max_results, match_on, fold_diacritics), boost)
+        pool = multiprocessing.Pool(len(chunks))
+        try:
+            parts = pool.map(_filter_chunk, chunks)
+            pool.close()
+        finally:
+            _filter_job = None
+            pool.terminate()
+            pool.join()
+
+        if index is not None:
+            items = items.items
+
+        primary = _primary_key(key)
+        results = []
+        for part in parts:
+            for i, score, rule in part:
+                item = items[i]
+                if index is None:
+                    value = primary(item).strip()
+                else:
+                    value = index[i][0][0]
+                results.append(((100.0 / score, value.lower(), score),
+                                (item, score, rule)))
+
+        results = _sort_results(results, ascending, max_results)
+
+        if include_score:
+            return results
+        return [t[0] for t in results]
+
+    def _filter(self, query, items, key, ascending, include_score,
+                min_score, max_results, match_on, fold_diacritics,
+                candidates=None, prune=True, boost=None, profile=None):
+        """Implement :meth:`filter`.
+
+        :param candidates: indices of the only ``items`` that may match
+            ``query`` or ``None`` to test all ``items``.
+        :type candidates: ``list``
+        :param prune: Skip MATCH_ALLCHARS for items that can't score
+            highly enough to be returned.
+        :type prune: ``Boolean``
+        :param boost: function that returns bonus points for an item
+        :type boost: ``callable``
+        :param profile: profile to record call in or ``None``
+        :type profile: :class:`FilterProfile`
+        :returns: ``(results, matched)`` where ``matched`` is a list of
+            the indices of all ``items`` matched by a rule for every word
+            in ``query`` (regardless of score, ``min_score`` or
+            ``max_results``) or ``None`` if ``query`` is empty.
+            If ``prune`` is ``True``, ``matched`` may be incomplete.
+        :rtype: ``tuple``
+
+        """
+        # Use pre-computed search keys if `items` is an index
+        findex = index = arrays = None
+        if isinstance(items, FilterIndex):
+            findex = items
+            index = items._keys
+            arrays = items._arrays
+            items = items.items
+
         if not query:
-            return items
+            return items, None
 
         # Remove preceding/trailing spaces
         query = query.strip()
 
         if not query:
-            return items
+            return items, None
 
         # Use user override if there is one
         fold_diacritics = self.settings.get('__workflow_diacritic_folding',
                                             fold_diacritics)
 
+        score_key = self._score_key
+        item_keys = self._item_keys
+        if profile is not None:
+            stats = profile._begin(query, [w.strip() for w in
+                                           query.lower().split(' ')
+                                           if w.strip()],
+                                   _search_patterns)
+            score_key = profile._score_key(score_key, stats)
+            item_keys = profile._timed(item_keys, stats, 'fold')
+            if callable(key):
+                key = profile._timed(key, stats, 'key')
+            else:
+                key = [(profile._timed(func, stats, 'key'), weight)
+                       for func, weight in key]
+            # rules can't be timed when scoring with NumPy
+            arrays = None
+
+        words = self._compile_query(query, fold_diacritics)
+        # whether any words are matched against folded search keys
+        fold = any([word.fold for word in words])
+        # `key` is ignored if `items` is an index
+        fields = _key_fields(key) if index is None else None
+
+        if match_on & MATCH_FUZZY_TYPO:
+            deletes = findex._deletes if findex is not None else None
+            for i, word in enumerate(words):
+                if len(word.text) >= _TYPO_MIN_LENGTH:
+                    typos = _TypoMatcher(word.text, deletes)
+                    # no need to check items if the index has no typos
+                    if not typos.empty:
+                        words[i] = word._replace(typos=typos)
+
+        # MATCH_ALLCHARS is the slowest rule and gives the lowest scores.
+        # If results are limited by `min_score` or `max_results`, stop
+        # running it once it can no longer produce a high enough score.
+        # The bound is only independent of the item for single-word
+        # queries.
+        ceiling = 0
+        # A bonus can lift any item into the results
+        if (prune and boost is None and match_on & MATCH_ALLCHARS and
+                ' ' not in query and
+                (min_score or (max_results and not ascending))):
+            # highest possible MATCH_ALLCHARS score (with a little slack)
+            ceiling = 100.0 / (len(query) + 1) * 1.000001
+            if fields:
+                ceiling *= max([weight for _, weight in fields])
+            if min_score and ceiling <= min_score:
+                match_on ^= MATCH_ALLCHARS
+                ceiling = 0
+            elif not max_results or ascending:
+                ceiling = 0
+        # (negated) primary sort keys of the best `max_results` results
+        best = []
+
+        # Only test items containing the query's trigrams
+        if findex is not None:
+            found = findex._candidates(query, match_on, fold_diacritics)
+            if found is not None and candidates is not None:
+                found = sorted(set(found).intersection(candidates))
+            if found is not None:
+                candidates = found
+
         results = []
+        matched = []
+        if profile is not None:
+            stats['items'] = len(items if candidates is None else candidates)
+
+        if arrays is not None and candidates is None:
+            # Score all items at once with NumPy
+            from .vectorized import filter_arrays
+            results, matched = filter_arrays(words, items, index, arrays,
+                                             match_on, self._score_key)
+            pairs = ()
+        elif candidates is None:
+            pairs = enumerate(items)
+        else:
+            pairs = ((i, items[i]) for i in candidates)
 
-        for item in items:
+        for i, item in pairs:
             skip = False
             score = 0
-            words = [s.strip() for s in query.split(' ')]
-            value = key(item).strip()
-            if value == '':
-                continue
-            for word in words:
-                if word == '':
+            rule = None
+            if fields:
+                scored = self._score_fields(item, fields, words, fold,
+                                            match_on, score_key, item_keys)
+                if scored is None:
                     continue
-                s, rule = self._filter_item(value, word, match_on,
-                                            fold_diacritics)
+                score, rule, skip, lower = scored
+            else:
+                if index is None:
+                    skeys = item_keys(key(item).strip(), fold)
+                    if skeys is None:  # empty search key
+                        continue
+                else:
+                    skeys = index[i]
+                    if skeys is None:  # empty search key
+                        continue
+                lower = skeys[0][1]
+                for word in words:
+                    s, rule = score_key(skeys[word.fold], word, match_on)
+
+                    if rule is None:  # No rule matched part of the query
+                        break
+                    if not s:  # Skip items that don't match part of query
+                        skip = True
+                    score += s
 
-                if not s:  # Skip items that don't match part of the query
-                    skip = True
-                score += s
+                if rule is None:
+                    continue
 
-            if skip:
-                continue
+            # Every word matched a rule, even if the score is 0
+            matched.append(i)
 
-            if score:
-                # use "reversed" `score` (i.e. highest becomes lowest) and
-                # `value` as sort key. This means items with the same score
-                # will be sorted in alphabetical not reverse alphabetical order
-                results.append(((100.0 / score, value.lower(), score),
+            if score and not skip:
+                # use "reversed" `score` (i.e. highest becomes lowest)
+                # and `value` as sort key. This means items with the
+                # same score will be sorted in alphabetical not reverse
+                # alphabetical order
+                results.append(((100.0 / score, lower, score),
                                 (item, score, rule)))
 
-        # sort on keys, then discard the keys
-        results.sort(reverse=ascending)
-        results = [t[1] for t in results]
+                if ceiling and score > min_score:
+                    key0 = -100.0 / score
+                    if len(best) < max_results:
+                        heapq.heappush(best, key0)
+                    elif key0 > best[0]:
+                        heapq.heapreplace(best, key0)
+                    # All top results beat the best MATCH_ALLCHARS score
+                    if (len(best) == max_results and
+                            -best[0] < 100.0 / ceiling):
+                        match_on ^= MATCH_ALLCHARS
+                        ceiling = 0
+
+        if boost is not None:
+            boosted = []
+            for (_, lower, score), (item, _, rule) in results:
+                score += boost(item)
+                if score:
+                    boosted.append(((100.0 / score, lower, score),
+                                    (item, score, rule)))
+            results = boosted
 
         if min_score:
-            results = [r for r in results if r[1] > min_score]
+            results = [t for t in results if t[1][1] > min_score]
 
-        if max_results and len(results) > max_results:
-            results = results[:max_results]
+        # sort on keys, then discard the keys
+        results = _sort_results(results, ascending, max_results)
+        if profile is not None:
+            profile._end(stats, len(results))
 
         # return list of ``(item, score, rule)``
         if include_score:
-            return results
+            return results, matched
         # just return list of items
-        return [t[0] for t in results]
+        return [t[0] for t in results], matched
 
-    def _filter_item(self, value, query, match_on, fold_diacritics):
-        """Filter ``value`` against ``query`` using rules ``match_on``.
+    def _item_keys(self, value, fold):
+        """Return search keys of ``value`` for :meth:`_score_key`.
 
-        :returns: ``(score, rule)``
+        Only the parts of the keys that every rule needs are computed.
+
+        :param value: stripped search key of item
+        :type value: ``unicode``
+        :param fold: whether to include keys folded to ASCII
+        :type fold: ``Boolean``
+        :returns: list of unfolded (and folded) keys or ``None`` if
+            ``value`` is empty
+        :rtype: ``list``
 
         """
-        query = query.lower()
+        if value == '':
+            return None
+        skeys = [(value, value.lower(), None, None, None, None)]
+        if fold:
+            folded = self.fold_to_ascii(value)
+            if folded == value:
+                skeys.append(skeys[0])
+            else:
+                skeys.append((folded, folded.lower(), None, None, None, None))
+        return skeys
+
+    def _score_fields(self, item, fields, words, fold, match_on,
+                      score_key, item_keys):
+        """Score several weighted search keys of ``item``.
+
+        Each word of the query is scored against every key, and the
+        best weighted score counts.
+
+        :param item: item to score
+        :param fields: ``(key, weight)`` tuples
+        :type fields: ``list``
+        :param words: compiled query
+        :type words: ``list``
+        :param fold: whether any words are matched against folded keys
+        :type fold: ``Boolean``
+        :param match_on: ``MATCH_*`` flags
+        :type match_on: ``int``
+        :param score_key: :meth:`_score_key` or a replacement
+        :type score_key: ``callable``
+        :param item_keys: :meth:`_item_keys` or a replacement
+        :type item_keys: ``callable``
+        :returns: ``(score, rule, skip, lowercase first key)`` or ``None``
+            if a word matched no key. ``skip`` is ``True`` if a word
+            scored 0.
+        :rtype: ``tuple``
+
+        """
+        keys = []
+        lower = None
+        for func, weight in fields:
+            skeys = item_keys(func(item).strip(), fold)
+            if lower is None:
+                lower = skeys[0][1] if skeys else ''
+            if skeys is not None:
+                keys.append((skeys, weight))
+
+        score = 0
+        skip = False
+        for word in words:
+            best = rule = None
+            for skeys, weight in keys:
+                s, r = score_key(skeys[word.fold], word, match_on)
+                if r is not None and (rule is None or s * weight > best):
+                    best, rule = s * weight, r
+
+            if rule is None:  # No rule matched this word in any key
+                return None
+            if not best:
+                skip = True
+            score += best
+
+        return score, rule, skip, lower
+
+    def _compile_query(self, query, fold_diacritics):
+        """Pre-process ``query`` for :meth:`_score_key`.
+
+        :param query: stripped query
+        :type query: ``unicode``
+        :param fold_diacritics: whether to match ASCII words against
+            folded search keys
+        :type fold_diacritics: ``Boolean``
+        :returns: list of :class:`_QueryWord` for each word of ``query``
+        :rtype: ``list``
 
-        if not isascii(query):
-            fold_diacritics = False
+        """
+        words = []
+        for word in query.lower().split(' '):
+            word = word.strip()
+            if word == '':
+                continue
+            words.append(_QueryWord(word,
+                                    int(bool(fold_diacritics) and
+                                        isascii(word)),
+                                    frozenset(word),
+                                    _char_mask(word),
+                                    _search_for_query(word),
+                                    None))
+        return words
+
+    def _score_key(self, skey, word, match_on):
+        """Score pre-computed search key ``skey`` against ``word``.
+
+        :param skey: search key as returned by :func:`_search_key`.
+            Elements that are ``None`` are computed as required.
+        :type skey: ``tuple``
+        :param word: query word as returned by :meth:`_compile_query`
+        :type word: :class:`_QueryWord`
+        :param match_on: ``MATCH_*`` flags
+        :type match_on: ``int``
+        :returns: ``(score, rule)``
 
-        if fold_diacritics:
-            value = self.fold_to_ascii(value)
+        """
+        query = word.text
+        value, lower, mask, capitals, atoms, initials = skey
 
         # pre-filter any items that do not contain all characters
         # of ``query`` to save on running several more expensive tests
-        if not set(query) <= set(value.lower()):
+        if mask is None:
+            found = word.chars <= set(lower)
+        else:
+            found = word.mask & mask == word.mask
 
-            return (0, None)
+        if not found:
+            # only a typo can be missing characters
+            if not (match_on & MATCH_FUZZY_TYPO and word.typos):
+
+                return (0, None)
+
+            match_on = MATCH_FUZZY_TYPO
 
         # item starts with query
-        if match_on & MATCH_STARTSWITH and value.lower().startswith(query):
+        if match_on & MATCH_STARTSWITH and lower.startswith(query):
             score = 100.0 - (len(value) / len(query))
 
             return (score, MATCH_STARTSWITH)
@@ -1950,21 +3960,20 @@ class Workflow(object):
         # query matches capitalised letters in item,
         # e.g. of = OmniFocus
         if match_on & MATCH_CAPITALS:
-            initials = ''.join([c for c in value if c in INITIALS])
-            if initials.lower().startswith(query):
-                score = 100.0 - (len(initials) / len(query))
+            if capitals is None:
+                capitals = _capitals(value)
+            if capitals.startswith(query):
+                score = 100.0 - (len(capitals) / len(query))
 
                 return (score, MATCH_CAPITALS)
 
         # split the item into "atoms", i.e. words separated by
         # spaces or other non-word characters
-        if (match_on & MATCH_ATOM or
-                match_on & MATCH_INITIALS_CONTAIN or
-                match_on & MATCH_INITIALS_STARTSWITH):
-            atoms = [s.lower() for s in split_on_delimiters(value)]
-            # print('atoms : %s  -->  %s' % (value, atoms))
-            # initials of the atoms
-            initials = ''.join([s[0] for s in atoms if s])
+        if atoms is None and (match_on & MATCH_ATOM or
+                              match_on & MATCH_INITIALS_CONTAIN or
+                              match_on & MATCH_INITIALS_STARTSWITH or
+                              match_on & MATCH_FUZZY_TYPO):
+            atoms, initials = _atoms(value, lower)
 
         if match_on & MATCH_ATOM:
             # is `query` one of the atoms in item?
@@ -1994,40 +4003,37 @@ class Workflow(object):
             return (score, MATCH_INITIALS_CONTAIN)
 
         # `query` is a substring of item
-        if match_on & MATCH_SUBSTRING and query in value.lower():
+        if match_on & MATCH_SUBSTRING and query in lower:
             score = 90.0 - (len(value) / len(query))
 
             return (score, MATCH_SUBSTRING)
 
+        # one of the atoms is `query` with a typo or two
+        if match_on & MATCH_FUZZY_TYPO and word.typos:
+            typos = None
+            distance = word.typos.distance
+            for atom in atoms:
+                d = distance(atom)
+                if d and (typos is None or d < typos):
+                    typos = d
+            if typos:
+                score = 90.0 - 10 * typos - (len(value) / len(query))
+
+                return (score, MATCH_FUZZY_TYPO)
+
         # finally, assign a score based on how close together the
         # characters in `query` are in item.
         if match_on & MATCH_ALLCHARS:
-            search = self._search_for_query(query)
-            match = search(value)
+            match = word.search(value, lower)
             if match:
-                score = 100.0 / ((1 + match.start()) *
-                                 (match.end() - match.start() + 1))
+                start, end = match
+                score = 100.0 / ((1 + start) * (end - start + 1))
 
                 return (score, MATCH_ALLCHARS)
 
         # Nothing matched
         return (0, None)
 
-    def _search_for_query(self, query):
-        if query in self._search_pattern_cache:
-            return self._search_pattern_cache[query]
-
-        # Build pattern: include all characters
-        pattern = []
-        for c in query:
-            # pattern.append('[^{0}]*{0}'.format(re.escape(c)))
-            pattern.append('.*?{0}'.format(re.escape(c)))
-        pattern = ''.join(pattern)
-        search = re.compile(pattern, re.IGNORECASE).search
-
-        self._search_pattern_cache[query] = search
-        return search
-
     def run(self, func, text_errors=False):
         """Call ``func`` to run your workflow.
 
@@ -2708,17 +4714,22 @@ class Workflow(object):
 
         .. note:: This only works for a subset of European languages.
 
+        If :attr:`text_cache` is set, results are cached in it.
+
         :param text: text to convert
         :type text: ``unicode``
         :returns: text containing only ASCII characters
         :rtype: ``unicode``
 
         """
-        if isascii(text):
-            return text
-        text = ''.join([ASCII_REPLACEMENTS.get(c, c) for c in text])
-        return unicode(unicodedata.normalize('NFKD',
-                       text).encode('ascii', 'ignore'))
+        if self.text_cache is None or isascii(text):
+            return fold_to_ascii(text)
+
+        key = ('fold', text)
+        folded = self.text_cache.get(key)
+        if folded is None:
+            folded = self.text_cache[key] = fold_to_ascii(text)
+        return folded
 
     def dumbify_punctuation(self, text):
         """Convert non-ASCII punctuation to closest ASCII equivalent.
@@ -2727,6 +4738,8 @@ class Workflow(object):
         workaday ASCII equivalents. This method is currently not used
         internally, but exists as a helper method for workflow authors.
 
+        If :attr:`text_cache` is set, results are cached in it.
+
         .. versionadded: 1.9.7
 
         :param text: text to convert
@@ -2738,8 +4751,14 @@ class Workflow(object):
         if isascii(text):
             return text
 
-        text = ''.join([DUMB_PUNCTUATION.get(c, c) for c in text])
-        return text
+        if self.text_cache is None:
+            return text.translate(_PUNCTUATION_TABLE)
+
+        key = ('dumbify', text)
+        dumb = self.text_cache.get(key)
+        if dumb is None:
+            dumb = self.text_cache[key] = text.translate(_PUNCTUATION_TABLE)
+        return dumb
 
     def _delete_directory_contents(self, dirpath, filter_func):
         """Delete all files in a directory.
@@ -2751,6 +4770,9 @@ class Workflow(object):
         :type filter_func ``callable``
 
         """
+        if self.memory_cache is not None:
+            self.memory_cache.clear()
+
         if os.path.exists(dirpath):
             for filename in os.listdir(dirpath):
                 if not filter_func(filename):
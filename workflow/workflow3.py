@@ -29,7 +29,7 @@ import json
 import os
 import sys
 
-from .workflow import ICON_WARNING, Workflow
+from .workflow import ICON_WARNING, MATCH_ALL, Workflow, _query_narrows
 
 
 class Variables(dict):
@@ -632,7 +632,8 @@ class Workflow3(Workflow):
 
         return super(Workflow3, self).cache_data(name, data)
 
-    def cached_data(self, name, data_func=None, max_age=60, session=False):
+    def cached_data(self, name, data_func=None, max_age=60, session=False,
+                    revalidate=None):
         """Cache API with session-scoped expiry.
 
         .. versionadded:: 1.25
@@ -644,8 +645,11 @@ class Workflow3(Workflow):
             max_age (int): Maximum allowable age of cache in seconds.
             session (bool, optional): Whether to scope the cache
                 to the current session.
+            revalidate (list, optional): Command to update stale data
+                in the background.
 
-        ``name``, ``data_func`` and ``max_age`` are the same as for the
+        ``name``, ``data_func``, ``max_age`` and ``revalidate`` are the
+        same as for the
         :meth:`~workflow.Workflow.cached_data` method on
         :class:`~workflow.Workflow`.
 
@@ -656,7 +660,72 @@ class Workflow3(Workflow):
         if session:
             name = self._mk_session_name(name)
 
-        return super(Workflow3, self).cached_data(name, data_func, max_age)
+        return super(Workflow3, self).cached_data(name, data_func, max_age,
+                                                  revalidate)
+
+    def filter(self, query, items, key=lambda x: x, ascending=False,
+               include_score=False, min_score=0, max_results=0,
+               match_on=MATCH_ALL, fold_diacritics=True, boost=None,
+               cache=False, session=False):
+        """Fuzzy search filter with session-scoped incremental matching.
+
+        .. versionadded:: 1.41
+
+        Args:
+            cache (bool, optional): Whether to cache results, or the
+                version of ``items``. Ignored if ``session`` is ``True``.
+            session (bool, optional): Whether to remember which items
+                matched ``query`` for the rest of the session.
+
+        See :meth:`Workflow.filter() <workflow.Workflow.filter>` for
+        the main documentation and other parameters.
+
+        If ``session`` is ``True``, the indices of the items that matched
+        ``query`` are cached with :attr:`session_id`. When the user
+        extends the query (e.g. from ``goo`` to ``goog``), only those
+        items are tested against the new query, instead of every item
+        in ``items``.
+
+        ``items`` must contain the same items in the same order
+        throughout the session.
+
+        """
+        if not session:
+            return super(Workflow3, self).filter(
+                query, items, key, ascending, include_score, min_score,
+                max_results, match_on, fold_diacritics, boost, cache)
+
+        name = '__workflow_filter_state'
+        candidates = None
+        state = self.cached_data(name, max_age=0, session=True)
+        if (state and state['size'] == len(items) and
+                state['match_on'] == match_on and
+                state['fold_diacritics'] == fold_diacritics and
+                _query_narrows(state['query'], query or '', match_on)):
+            candidates = state['candidates']
+            self.logger.debug('filter: %d candidate(s) from query %r',
+                              len(candidates), state['query'])
+
+        # Don't prune: every matching item must be recorded
+        results, matched = self._filter(query, items, key, ascending,
+                                        include_score, min_score,
+                                        max_results, match_on,
+                                        fold_diacritics, candidates,
+                                        prune=False, boost=boost,
+                                        profile=self.filter_profile)
+
+        if matched is None:  # empty query
+            self.cache_data(name, None, session=True)
+        else:
+            self.cache_data(name, {
+                'query': query.strip(),
+                'size': len(items),
+                'match_on': match_on,
+                'fold_diacritics': fold_diacritics,
+                'candidates': matched,
+            }, session=True)
+
+        return results
 
     def clear_session_cache(self, current=False):
         """Remove session data from the cache.